@@ -0,0 +1,185 @@
+"""
+Cache Module - Response caches in front of the LLM-RAG and TTS stages
+
+- SemanticCache: query => (response_text, audio) for near-duplicate questions
+- AudioCache: (text, voice settings) => synthesized audio, persistent on disk
+
+Input: Query text (string) and its generated response (string, audio bytes)
+Output: Previously generated response for a semantically equivalent query
+"""
+
+import functools
+import hashlib
+import os
+import threading
+import uuid
+from typing import Callable, List, Optional
+
+import numpy as np
+
+
+class SemanticCache:
+    def __init__(self, embedding_func: Callable[[str], List[float]],
+                 similarity_threshold: float = 0.92, max_entries: int = 256):
+        """
+        Initialize the semantic response cache
+
+        A lookup hits when a stored query's embedding has cosine similarity of
+        at least similarity_threshold with the new query, so near-duplicate
+        questions reuse the earlier answer and its synthesized audio. Entries
+        live in memory only (a few tens of KB of audio each), so nothing is
+        left on disk once the process exits. Lookups and stores carry the
+        knowledge-base version the answer was built from; a newer version
+        drops every entry, so answers from replaced documents are not served.
+
+        Args:
+        - embedding_func: text => L2-normalized embedding (e.g. LLMRAGModule.embed)
+        - similarity_threshold: minimum cosine similarity for a hit
+        - max_entries: cache size; the oldest entry is evicted first
+        """
+        self.embedding_func = embedding_func
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self._vectors = None  # (n, dim) float32, one row per entry
+        self._entries = []  # (response_text, audio bytes), aligned with _vectors
+        self._version = 0  # knowledge-base version of the stored entries
+        self._lock = threading.Lock()
+
+    def _advance(self, version: int):
+        # Caller holds the lock
+        if version > self._version:
+            self._version = version
+            self._vectors = None
+            self._entries = []
+
+    def get(self, query: str, version: int = 0) -> Optional[tuple]:
+        """
+        Look up a response for a semantically equivalent query
+
+        Args:
+        - query: query text
+        - version: current knowledge-base version (e.g. the vector store's)
+
+        Returns:
+        - (response_text, audio bytes) on a hit, otherwise None
+        """
+        vector = np.asarray(self.embedding_func(query), dtype=np.float32)
+        with self._lock:
+            self._advance(version)
+            if not self._entries:
+                return None
+            # Embeddings are normalized, so the dot product is the cosine similarity
+            scores = self._vectors @ vector
+            best = int(np.argmax(scores))
+            if scores[best] < self.similarity_threshold:
+                return None
+            return self._entries[best]
+
+    def put(self, query: str, response_text: str, audio: bytes, version: int = 0):
+        """
+        Store a generated response and its audio for later lookups. A response
+        built from an older knowledge-base version than the cache's is dropped.
+        """
+        vector = np.asarray(self.embedding_func(query), dtype=np.float32)[None, :]
+        with self._lock:
+            self._advance(version)
+            if version < self._version:
+                return
+            if len(self._entries) >= self.max_entries:
+                self._entries.pop(0)
+                self._vectors = self._vectors[1:]
+            self._entries.append((response_text, audio))
+            self._vectors = vector if self._vectors is None else np.vstack([self._vectors, vector])
+
+
+class AudioCache:
+    def __init__(self, cache_dir: str = "./tts_cache", max_bytes: int = 512 * 1024 * 1024,
+                 memory_entries: int = 128):
+        """
+        Initialize the synthesized-audio cache
+
+        Audio is stored on disk under sha1(text|voice settings) and survives
+        restarts; recently read entries are also kept in memory. When the
+        directory grows past max_bytes the least recently used files are removed.
+
+        Args:
+        - cache_dir: directory holding the cached audio files
+        - max_bytes: disk budget for cached audio
+        - memory_entries: number of hot entries kept in memory
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        # A key's audio never changes once written, so cached reads stay valid
+        self._read = functools.lru_cache(maxsize=memory_entries)(self._read_file)
+        self._total_bytes = sum(
+            entry.stat().st_size for entry in os.scandir(cache_dir) if entry.is_file()
+        )
+
+    @staticmethod
+    def key(text: str, voice_model: str, voice: str, language: str, response_format: str) -> str:
+        """
+        Cache key for one synthesis request
+        """
+        return hashlib.sha1(
+            f"{text}|{voice_model}|{voice}|{language}|{response_format}".encode("utf-8")
+        ).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    @staticmethod
+    def _read_file(path: str) -> bytes:
+        with open(path, "rb") as f:
+            return f.read()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Cached audio for a key, or None on a miss
+        """
+        path = self._path(key)
+        try:
+            audio = self._read(path)
+            # Bump the mtime so eviction sees this entry as recently used
+            os.utime(path)
+        except OSError:
+            self._read.cache_clear()
+            return None
+        return audio
+
+    def put(self, key: str, audio: bytes):
+        """
+        Store synthesized audio and evict old entries beyond the disk budget
+        """
+        if not audio:
+            return
+        path = self._path(key)
+        # Write then rename so a concurrent get never reads a partial file
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(audio)
+        with self._lock:
+            if os.path.exists(path):
+                os.remove(tmp_path)
+                return
+            os.replace(tmp_path, path)
+            self._total_bytes += len(audio)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        entries = sorted(
+            (entry for entry in os.scandir(self.cache_dir)
+             if entry.is_file() and not entry.name.endswith(".tmp")),
+            key=lambda entry: entry.stat().st_mtime
+        )
+        for entry in entries:
+            if self._total_bytes <= self.max_bytes:
+                break
+            size = entry.stat().st_size
+            try:
+                os.remove(entry.path)
+            except OSError:
+                continue
+            self._total_bytes -= size
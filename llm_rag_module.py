@@ -1,119 +1,664 @@
 import os
-from typing import List
+import json
+import shutil
+import tempfile
+import uuid
+import asyncio
+import functools
+import operator
+import threading
+from typing import Annotated, List, Optional
+import faiss
+import numpy as np
+import onnxruntime as ort
 from dotenv import load_dotenv
 from langchain_community.vectorstores import FAISS
-# from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_community.embeddings import HuggingFaceEmbeddings
+from langchain_community.vectorstores.utils import DistanceStrategy
+from langchain_core.embeddings import Embeddings
+from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTOptimizer, ORTQuantizer
+from optimum.onnxruntime.configuration import AutoQuantizationConfig, OptimizationConfig
+from transformers import AutoTokenizer
 from langchain.chat_models import init_chat_model
 from langchain_core.messages import SystemMessage
 from langchain_core.messages import HumanMessage
+from langchain_core.messages import AIMessageChunk
 from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph import MessagesState, StateGraph
 from langgraph.graph import END
 from langgraph.prebuilt import ToolNode, tools_condition
 from langchain_core.tools import tool
+from langchain_core.runnables import RunnableConfig
 from langchain.docstore.document import Document
 
+# Embedding models and FAISS stores shared by every LLMRAGModule in the process.
+# Stores are keyed by absolute path, so documents added through one module are
+# visible to all of them.
+_EMBEDDINGS_CACHE: dict = {}
+_VECTOR_STORE_CACHE: dict = {}
+_SHARED_CACHE_LOCK = threading.Lock()
+
+# Documents added since the last compact(), appended next to index.faiss
+PENDING_DOCS_FILE = "pending_docs.jsonl"
+
+# ONNX embedding precision => model file inside cache_dir/<precision>
+_ONNX_MODEL_FILES = {
+    "int8": "model_optimized_quantized.onnx",
+    "fp16": "model_optimized.onnx",
+    "fp32": "model_optimized.onnx",
+}
+
+
+class MappedFAISS(FAISS):
+    """
+    FAISS store that remembers whether its index is currently memory-mapped
+    (read-only) or a writable in-memory copy, and how many documents sit in
+    the pending_docs.jsonl sidecar awaiting compact(). version increases on
+    every write, so caches keyed on it never serve results of an older state.
+
+    HNSW graphs cannot remove vectors, so deleting from an HNSW index only
+    tombstones the vectors' positions: search() skips them and
+    drop_tombstones() (run by compact()) rebuilds the graph without them.
+    """
+
+    index_mmapped: bool = False
+    pending_count: int = 0
+    index_path: Optional[str] = None
+    version: int = 0
+    tombstones: frozenset = frozenset()  # deleted HNSW positions still in the graph
+    _positions: Optional[dict] = None  # docstore id => index position, built on first use
+    _search_params = None  # HNSW search parameters excluding the tombstones
+
+    def read_index(self, index_path: str, mmap: bool):
+        """
+        Replace the index with the one at index_path. With mmap=True it is
+        memory-mapped read-only, so pages are loaded from disk on demand
+        instead of copied into RAM; mmap=False gives a writable in-memory copy.
+        """
+        index = None
+        if mmap:
+            # IO_FLAG_MMAP_IFC (newer faiss) also maps flat-code storage
+            flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY | getattr(faiss, "IO_FLAG_MMAP_IFC", 0)
+            try:
+                index = faiss.read_index(index_path, flags)
+            except RuntimeError as e:
+                print(f"[Index mmap failed, loading into memory] {e}")
+        self.index_mmapped = index is not None
+        if index is None:
+            index = faiss.read_index(index_path)
+
+        if isinstance(index, faiss.IndexHNSW):
+            index.hnsw.efSearch = 64
+        self.index = index
+        self.index_path = index_path
+
+    def _ensure_writable(self):
+        # faiss aborts the process (a C++ assertion, not an exception) when a
+        # read-only mapped index is modified, so every write goes to a RAM copy.
+        # A mapped index never holds un-persisted additions, so the file is current.
+        if self.index_mmapped:
+            self.read_index(self.index_path, mmap=False)
+
+    def _write(self, method, *args, **kwargs):
+        self._ensure_writable()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            # Bumped only once the write is done: a search running during the
+            # write caches its result under the old version, which is never read again
+            self.version += 1
+
+    def _id_positions(self) -> dict:
+        if self._positions is None:
+            self._positions = {doc_id: pos for pos, doc_id in self.index_to_docstore_id.items()}
+        return self._positions
+
+    def _add(self, method, *args, **kwargs):
+        start = self.index.ntotal
+        ids = method(*args, **kwargs)
+        if self._positions is not None:
+            self._positions.update(
+                (self.index_to_docstore_id[pos], pos) for pos in range(start, self.index.ntotal)
+            )
+        return ids
+
+    def add_texts(self, *args, **kwargs):
+        return self._write(self._add, super().add_texts, *args, **kwargs)
+
+    def add_embeddings(self, *args, **kwargs):
+        return self._write(self._add, super().add_embeddings, *args, **kwargs)
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs):
+        return self._write(self._delete, ids, **kwargs)
+
+    def _delete(self, ids: Optional[List[str]] = None, **kwargs):
+        if ids is None or not isinstance(self.index, faiss.IndexHNSW):
+            # remove_ids shifts every later position
+            self._positions = None
+            return super().delete(ids, **kwargs)
+
+        # HNSW graphs do not support remove_ids; tombstone the positions instead
+        doomed = set(ids)
+        missing = [doc_id for doc_id in doomed if doc_id not in self.docstore._dict]
+        if missing:
+            raise ValueError(f"Some specified ids do not exist in the current store. Ids not found: {missing}")
+        positions = self._id_positions()
+        dropped = {positions.pop(doc_id) for doc_id in doomed}
+        for pos in dropped:
+            del self.index_to_docstore_id[pos]
+        self.docstore.delete(list(doomed))
+        self.tombstones = self.tombstones | dropped
+        self._search_params = None
+        return True
+
+    def drop_tombstones(self):
+        """
+        Rebuild an HNSW index from its live vectors only, so tombstoned
+        positions stop costing memory and search time
+        """
+        if self.tombstones:
+            self._write(self._drop_tombstones)
+
+    def _drop_tombstones(self):
+        keep = sorted(self.index_to_docstore_id)
+        vectors = self.index.reconstruct_n(0, self.index.ntotal)[keep]
+        old = self.index
+        index = faiss.IndexHNSWFlat(old.d, old.hnsw.nb_neighbors(1), old.metric_type)
+        index.hnsw.efConstruction = old.hnsw.efConstruction
+        index.hnsw.efSearch = old.hnsw.efSearch
+        index.add(vectors)
+
+        self.index_to_docstore_id = {new: self.index_to_docstore_id[pos] for new, pos in enumerate(keep)}
+        self.index = index
+        self.tombstones = frozenset()
+        self._positions = None
+        self._search_params = None
+
+    def search_vectors(self, queries: np.ndarray, k: int):
+        """
+        index.search over the live vectors: tombstoned positions are excluded
+        by an ID selector, so every query still gets up to k live results
+        """
+        if not self.tombstones:
+            return self.index.search(queries, k)
+        if self._search_params is None:
+            dropped = np.fromiter(self.tombstones, dtype=np.int64, count=len(self.tombstones))
+            self._search_params = faiss.SearchParametersHNSW(
+                sel=faiss.IDSelectorNot(faiss.IDSelectorBatch(dropped)),
+                efSearch=self.index.hnsw.efSearch,
+            )
+        return self.index.search(queries, k, params=self._search_params)
+
+    def save_local(self, folder_path: str, index_name: str = "index"):
+        """
+        FAISS.save_local through temporary files renamed over the old ones.
+        Truncating index.faiss in place kills every process that has it
+        memory-mapped (SIGBUS); after a rename their mappings keep the old inode.
+        """
+        os.makedirs(folder_path, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(prefix=".save-", dir=folder_path)
+        try:
+            super().save_local(tmp_dir, index_name)
+            for name in (f"{index_name}.pkl", f"{index_name}.faiss"):
+                os.replace(os.path.join(tmp_dir, name), os.path.join(folder_path, name))
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def merge_from(self, *args, **kwargs):
+        self._positions = None
+        return self._write(super().merge_from, *args, **kwargs)
+
+    def replace(self, texts: List[str], vectors: List[List[float]], ids: List[str],
+                metadatas: Optional[List[dict]] = None):
+        """
+        Add documents under the given ids, first dropping any vectors already
+        stored under them, so a re-imported document never shows up twice
+        """
+        metadatas = metadatas if metadatas is not None else [{} for _ in texts]
+        # Within one call the last entry per id wins, as in the sidecar replay
+        latest = {doc_id: i for i, doc_id in enumerate(ids)}
+        order = sorted(latest.values())
+        stale = [doc_id for doc_id in latest if doc_id in self.docstore._dict]
+        if stale:
+            self.delete(stale)
+        self.add_embeddings(
+            [(texts[i], vectors[i]) for i in order],
+            metadatas=[metadatas[i] for i in order],
+            ids=[ids[i] for i in order],
+        )
+
+
+class ONNXEmbeddings(Embeddings):
+    """
+    SBERT embeddings served from an optimized ONNX export.
+
+    The export and graph fusion (fused attention / LayerNorm / GELU) run once
+    into cache_dir. By default the fused graph is dynamically INT8-quantized on
+    CPU and converted to FP16 on a CUDA host; precision ("int8", "fp16", "fp32")
+    overrides that choice. Later constructions load the cached model directly.
+    Outputs are mean-pooled in FP32 and L2-normalized like
+    HuggingFaceEmbeddings(normalize_embeddings=True), so the existing FAISS
+    index stays compatible.
+    """
+
+    def __init__(self, model_name: str = "jhgan/ko-sroberta-nli",
+                 cache_dir: str = "./index/onnx_ko_sbert", max_length: int = 128,
+                 device: Optional[str] = None, precision: Optional[str] = None,
+                 batch_size: int = 64):
+        self.model_name = model_name
+        self.max_length = max_length
+        self.batch_size = batch_size
+        self.device = device or (
+            "cuda" if "CUDAExecutionProvider" in ort.get_available_providers() else "cpu"
+        )
+        self.precision = precision or ("fp16" if self.device == "cuda" else "int8")
+        if self.precision not in _ONNX_MODEL_FILES:
+            raise ValueError(f"Unsupported embedding precision: {self.precision}")
+
+        model_dir = os.path.join(cache_dir, self.precision)
+        file_name = _ONNX_MODEL_FILES[self.precision]
+        if not os.path.exists(os.path.join(model_dir, file_name)):
+            self._build(model_name, cache_dir, model_dir)
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.model = ORTModelForFeatureExtraction.from_pretrained(
+            model_dir,
+            file_name=file_name,
+            provider="CUDAExecutionProvider" if self.device == "cuda" else "CPUExecutionProvider",
+        )
+
+    def _build(self, model_name: str, cache_dir: str, model_dir: str):
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model = ORTModelForFeatureExtraction.from_pretrained(model_name, export=True)
+        model.save_pretrained(cache_dir)
+        tokenizer.save_pretrained(cache_dir)
+
+        # Fuse attention and friends first, the ORT counterpart of
+        # BetterTransformer's fused MHA
+        optimizer = ORTOptimizer.from_pretrained(model)
+        if self.precision == "fp16":
+            optimizer.optimize(
+                save_dir=model_dir,
+                optimization_config=OptimizationConfig(optimization_level=2, optimize_for_gpu=True, fp16=True),
+            )
+        elif self.precision == "fp32":
+            optimizer.optimize(save_dir=model_dir, optimization_config=OptimizationConfig(optimization_level=2))
+        else:
+            optimized_dir = os.path.join(cache_dir, "optimized")
+            optimizer.optimize(save_dir=optimized_dir, optimization_config=OptimizationConfig(optimization_level=2))
+
+            quantizer = ORTQuantizer.from_pretrained(optimized_dir, file_name="model_optimized.onnx")
+            qconfig = AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=True)
+            quantizer.quantize(save_dir=model_dir, quantization_config=qconfig)
+        tokenizer.save_pretrained(model_dir)
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        inputs = self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=self.max_length,
+            return_tensors="np",
+        )
+        token_embeddings = self.model(**inputs).last_hidden_state.astype(np.float32)
+
+        # Mean pooling over real tokens, then L2-normalize for cosine search
+        mask = inputs["attention_mask"][..., None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled.tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        texts = list(texts)
+        # Length-sorted batches keep padding (and memory) per forward pass small
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        vectors = [None] * len(texts)
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            for i, vector in zip(batch, self._embed([texts[i] for i in batch])):
+                vectors[i] = vector
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text])[0]
+
+
+@tool(response_format="content_and_artifact")
+def retrieve(query: str, config: RunnableConfig):
+    """Retrieve relevant documents from vector store using similarity search."""
+    return config["configurable"]["rag_module"]._retrieve(query)
+
+
+class _QueryKey(str):
+    """
+    Query cache key: hashes and compares as the normalized (stripped,
+    lowercased) query, but embeds the query as the user wrote it, since the
+    embedding model is case-sensitive
+    """
+
+    def __new__(cls, query: str):
+        key = super().__new__(cls, query.strip().lower())
+        key.text = query.strip()
+        return key
+
+
+# System message opening every conversation turn (see _chat_input)
+_CALL_SYSTEM_MESSAGE = (
+    "You are on a phone call. Respond in natural spoken Korean. Be brief and clear. Do not make mistakes."
+)
+
+_GENERATE_SYSTEM_PREFIX = (
+    "You are a real human, and is having a phone callfor question-answering tasks. "
+    "Use the following pieces of retrieved context to answer "
+    "the question. Always say one sentence per response. "
+    "answer concise. do not generate any markdown related symbols\n\n"
+)
+
+
+class RAGState(MessagesState):
+    # Append-only bookkeeping maintained by the nodes, so generate() can slice
+    # the history instead of rescanning every message on each turn
+    conv_msg_idxs: Annotated[List[int], operator.add]  # human / system / final ai messages
+    last_tool_span: int  # start of the most recent run of tool messages
+    indexed_upto: int  # number of messages already classified
+
+
+# Graph nodes are module-level and read the LLMRAGModule from the run config,
+# so the graph is compiled once per process instead of once per instance
+def _query_or_respond(state: RAGState, config: RunnableConfig):
+    rag = config["configurable"]["rag_module"]
+    messages = state["messages"]
+    response = rag.llm_with_tools.invoke(messages)
+
+    # Only the messages added since the last node ran (this turn's input) are new
+    conv_idxs = [
+        i for i in range(state.get("indexed_upto", 0), len(messages))
+        if messages[i].type in ("human", "system")
+    ]
+    if not response.tool_calls:
+        conv_idxs.append(len(messages))
+    return {"messages": [response], "conv_msg_idxs": conv_idxs, "indexed_upto": len(messages) + 1}
+
+
+_TOOL_NODE = ToolNode([retrieve])
+
+
+def _tools(state: RAGState, config: RunnableConfig):
+    update = _TOOL_NODE.invoke(state, config)
+    start = len(state["messages"])
+    return {
+        "messages": update["messages"],
+        "last_tool_span": start,
+        "indexed_upto": start + len(update["messages"]),
+    }
+
+
+def _generate(state: RAGState, config: RunnableConfig):
+    rag = config["configurable"]["rag_module"]
+    messages = state["messages"]
+    tool_messages = messages[state["last_tool_span"]:]
+
+    # Use the Document artifacts directly instead of the serialized tool output
+    docs = [doc for message in tool_messages for doc in (message.artifact or ())]
+    docs_content = "\n\n".join(doc.page_content for doc in docs)
+    system_message_content = _GENERATE_SYSTEM_PREFIX + docs_content
+    conversation_messages = [messages[i] for i in state["conv_msg_idxs"]]
+    prompt = [SystemMessage(system_message_content)] + conversation_messages
+    response = rag.llm.invoke(prompt)
+    return {"messages": [response], "conv_msg_idxs": [len(messages)], "indexed_upto": len(messages) + 1}
+
+
+@functools.lru_cache(maxsize=None)
+def _compiled_graph():
+    graph_builder = StateGraph(RAGState)
+    graph_builder.add_node("query_or_respond", _query_or_respond)
+    graph_builder.add_node("tools", _tools)
+    graph_builder.add_node("generate", _generate)
+
+    graph_builder.set_entry_point("query_or_respond")
+    graph_builder.add_conditional_edges(
+        "query_or_respond",
+        tools_condition,
+        {END: END, "tools": "tools"},
+    )
+    graph_builder.add_edge("tools", "generate")
+    graph_builder.add_edge("generate", END)
+
+    return graph_builder.compile()
+
+
 class LLMRAGModule:
-    def __init__(self, model_name: str = "gpt-4o-mini", vector_db_path: str = "./index/faiss_ko_sbert"):
+    def __init__(self, model_name: str = "gpt-4o-mini", vector_db_path: str = "./index/faiss_ko_sbert",
+                 embedding_precision: Optional[str] = None):
         """
         Initialize LLM-RAG module
+
+        Args:
+        - embedding_precision: ONNX embedder precision ("int8", "fp16", "fp32");
+          None picks INT8 on CPU and FP16 on CUDA
         """
         load_dotenv(dotenv_path=".env")
 
         self.llm = init_chat_model(model_name, model_provider="openai", temperature=0.1, max_tokens=128)
-
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name="jhgan/ko-sroberta-nli",
-            model_kwargs={"device": "cpu"},
-            encode_kwargs={"normalize_embeddings": True},
-        )
+        # Bind once; bind_tools rebuilds the tool's JSON schema on every call
+        self.llm_with_tools = self.llm.bind_tools([retrieve])
 
         self.vector_db_path = vector_db_path
-        self.vector_store = FAISS.load_local(
-            vector_db_path,
-            self.embeddings,
-            allow_dangerous_deserialization=True,
-        )
+        with _SHARED_CACHE_LOCK:
+            embeddings_key = ("jhgan/ko-sroberta-nli", embedding_precision)
+            if embeddings_key not in _EMBEDDINGS_CACHE:
+                _EMBEDDINGS_CACHE[embeddings_key] = ONNXEmbeddings(embeddings_key[0], precision=embedding_precision)
+            self.embeddings = _EMBEDDINGS_CACHE[embeddings_key]
 
-        @tool(response_format="content_and_artifact")
-        def retrieve(query: str):
-            """Retrieve relevant documents from vector store using similarity search."""
-            retrieved_docs = self.vector_store.similarity_search(query, k=2)
+            store_key = os.path.abspath(vector_db_path)
+            if store_key not in _VECTOR_STORE_CACHE:
+                self.vector_store = MappedFAISS.load_local(
+                    vector_db_path,
+                    self.embeddings,
+                    allow_dangerous_deserialization=True,
+                )
+                self._upgrade_index()
+                if os.path.exists(self._pending_path):
+                    # Un-compacted additions live only in the sidecar; keep the index in RAM
+                    self._replay_pending()
+                else:
+                    self._load_index(mmap=True)
+                _VECTOR_STORE_CACHE[store_key] = self.vector_store
+            self.vector_store = _VECTOR_STORE_CACHE[store_key]
+
+        @functools.lru_cache(maxsize=512)
+        def _embed_query_cached(key: _QueryKey):
+            return tuple(self.embeddings.embed_query(key.text))
+
+        # The store version is part of the key so results cached before another
+        # module sharing this store added or replaced documents are not served
+        @functools.lru_cache(maxsize=512)
+        def _retrieve_cached(key: _QueryKey, version: int):
+            vector = list(_embed_query_cached(key))
+            retrieved_docs = self._search_by_vectors([vector], k=2)[0]
             serialized = "\n\n".join(
                 (f"Source: {doc.metadata}\nContent: {doc.page_content}")
                 for doc in retrieved_docs
             )
-            return serialized, retrieved_docs
+            return serialized, tuple(retrieved_docs)
+
+        self._embed_query_cached = _embed_query_cached
+        self._retrieve_cached = _retrieve_cached
 
         self.retrieve_tool = retrieve
         self.memory = MemorySaver()
         self.graph = self.build_graph()
 
-    def build_graph(self):
-        def query_or_respond(state: MessagesState):
-            llm_with_tools = self.llm.bind_tools([self.retrieve_tool])
-            response = llm_with_tools.invoke(state["messages"])
-            return {"messages": [response]}
-
-        tools = ToolNode([self.retrieve_tool])
-
-        def generate(state: MessagesState):
-            recent_tool_messages = []
-            for message in reversed(state["messages"]):
-                if message.type == "tool":
-                    recent_tool_messages.append(message)
-                else:
-                    break
-            tool_messages = recent_tool_messages[::-1]
-
-            docs_content = "\n\n".join(doc.content for doc in tool_messages)
-            system_message_content = (
-                "You are a real human, and is having a phone callfor question-answering tasks. "
-                "Use the following pieces of retrieved context to answer "
-                "the question. Always say one sentence per response. "
-                "answer concise. do not generate any markdown related symbols\n\n"
-                f"{docs_content}"
+    def _retrieve(self, query: str):
+        serialized, retrieved_docs = self._retrieve_cached(
+            _QueryKey(query), self.vector_store.version
+        )
+        return serialized, list(retrieved_docs)
+
+    def _upgrade_index(self, min_vectors: int = 10_000, hnsw_m: int = 32):
+        """
+        Rebuild the default L2 index as an inner-product index over
+        L2-normalized vectors, so cosine search is a single dot product.
+        Once the store is large enough for sub-linear search to pay off it is
+        built as HNSW; small stores stay exact with IndexFlatIP.
+        """
+        index = self.vector_store.index
+        if not isinstance(index, (faiss.IndexFlat, faiss.IndexHNSWFlat)):
+            return
+
+        use_hnsw = index.ntotal >= min_vectors
+        is_hnsw = isinstance(index, faiss.IndexHNSWFlat)
+        if index.metric_type != faiss.METRIC_INNER_PRODUCT or (use_hnsw and not is_hnsw):
+            dim = index.d
+            vectors = index.reconstruct_n(0, index.ntotal)
+            faiss.normalize_L2(vectors)
+            if use_hnsw:
+                index = faiss.IndexHNSWFlat(dim, hnsw_m, faiss.METRIC_INNER_PRODUCT)
+                index.hnsw.efConstruction = 200
+                # Persisted with the index, so loads that skip read_index search at 64 too
+                index.hnsw.efSearch = 64
+            else:
+                index = faiss.IndexFlatIP(dim)
+            index.add(vectors)
+
+            self.vector_store.index = index
+            self.vector_store.save_local(self.vector_db_path)
+
+        # Indexes upgraded before efSearch was set at build time were saved with 16
+        if isinstance(index, faiss.IndexHNSW):
+            index.hnsw.efSearch = 64
+
+        # The metric is not persisted by save_local, so set it on every load
+        self.vector_store.distance_strategy = DistanceStrategy.MAX_INNER_PRODUCT
+
+    def _load_index(self, mmap: bool):
+        """
+        Re-read the persisted FAISS index, memory-mapped read-only (mmap=True)
+        or as a writable in-memory copy. Writes through the store switch a
+        mapped index to an in-memory copy on their own (MappedFAISS).
+        """
+        self.vector_store.read_index(os.path.join(self.vector_db_path, "index.faiss"), mmap)
+
+    @property
+    def _pending_path(self) -> str:
+        return os.path.join(self.vector_db_path, PENDING_DOCS_FILE)
+
+    def _replay_pending(self):
+        """
+        Re-apply documents appended since the last compact() to the in-memory index.
+        """
+        records = {}
+        lines = 0
+        with open(self._pending_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn last line from an interrupted append
+                    continue
+                # A later line for the same id is a replacement; the last one wins
+                records.pop(record["id"], None)
+                records[record["id"]] = record
+                lines += 1
+        if records:
+            self.vector_store.replace(
+                [record["page_content"] for record in records.values()],
+                [record["embedding"] for record in records.values()],
+                list(records),
+                metadatas=[record["metadata"] for record in records.values()],
             )
-            conversation_messages = [
-                message
-                for message in state["messages"]
-                if message.type in ("human", "system")
-                or (message.type == "ai" and not message.tool_calls)
-            ]
-            prompt = [SystemMessage(system_message_content)] + conversation_messages
-            response = self.llm.invoke(prompt)
-            return {"messages": [response]}
-
-        graph_builder = StateGraph(MessagesState)
-        graph_builder.add_node(query_or_respond)
-        graph_builder.add_node(tools)
-        graph_builder.add_node(generate)
-
-        graph_builder.set_entry_point("query_or_respond")
-        graph_builder.add_conditional_edges(
-            "query_or_respond",
-            tools_condition,
-            {END: END, "tools": "tools"},
+        self.vector_store.pending_count = lines
+
+    def build_graph(self):
+        """
+        Attach this module to the shared compiled graph. Only the checkpointer
+        and the module passed to the nodes through the config differ per instance.
+        """
+        return _compiled_graph().copy(update={"checkpointer": self.memory}).with_config(
+            {"configurable": {"rag_module": self}}
         )
-        graph_builder.add_edge("tools", "generate")
-        graph_builder.add_edge("generate", END)
 
-        return graph_builder.compile(checkpointer=self.memory)
+    def add_documents(self, documents: List[str], compact_threshold: int = 10_000,
+                      ids: Optional[List[str]] = None) -> bool:
+        """
+        Embed and add documents. They are searchable immediately and persisted
+        to a pending_docs.jsonl sidecar; the full index is rewritten by
+        compact() once compact_threshold documents are pending.
+
+        With ids (e.g. Notion page ids), a document whose id is already stored
+        replaces the earlier version instead of being added next to it.
+        """
+        try:
+            texts = list(documents)
+            if not texts:
+                return True
+            vectors = self.embeddings.embed_documents(texts)
+            ids = list(ids) if ids is not None else [str(uuid.uuid4()) for _ in texts]
 
-    def add_documents(self, documents: List[str]) -> bool:
+            # Append-only persistence: the cost is proportional to this batch,
+            # not to the size of the index
+            with open(self._pending_path, "a", encoding="utf-8") as f:
+                for doc_id, text, vector in zip(ids, texts, vectors):
+                    f.write(json.dumps(
+                        {"id": doc_id, "page_content": text, "metadata": {}, "embedding": vector},
+                        ensure_ascii=False,
+                    ) + "\n")
+            self.vector_store.replace(texts, vectors, ids)
+            self._retrieve_cached.cache_clear()
+
+            # Counted in memory; re-reading the sidecar would cost O(backlog) per add
+            self.vector_store.pending_count += len(texts)
+            if self.vector_store.pending_count >= compact_threshold:
+                return self.compact()
+            return True
+        except Exception as e:
+            print(f"[Error adding documents] {e}")
+            return False
 
+    def compact(self) -> bool:
+        """
+        Write the in-memory index and docstore (including pending additions)
+        with save_local, drop the sidecar and memory-map the result again.
+        Nothing is written while no additions are pending. Vectors of replaced
+        documents are dropped from an HNSW index here, not on every replace.
+        """
         try:
-            docs = [Document(page_content=content) for content in documents]
-            self.vector_store.add_documents(docs)
+            if self.vector_store.pending_count == 0 and not os.path.exists(self._pending_path):
+                return True
+            self.vector_store.drop_tombstones()
             self.vector_store.save_local(self.vector_db_path)
+            if os.path.exists(self._pending_path):
+                os.remove(self._pending_path)
+            self.vector_store.pending_count = 0
+            self._load_index(mmap=True)
             return True
         except Exception as e:
-            print(f"[Error adding documents] {e}")
+            print(f"[Error compacting index] {e}")
             return False
 
+    def _search_by_vectors(self, vectors: List[List[float]], k: int) -> List[List[Document]]:
+        """
+        Search FAISS for a whole batch of query vectors in one index.search call.
+        FAISS already keeps only the top k per query, so the results just map
+        ids back to documents, skipping langchain's per-query Python path.
+        """
+        queries = np.asarray(vectors, dtype=np.float32)
+        _, indices = self.vector_store.search_vectors(queries, k)
+        docstore = self.vector_store.docstore
+        id_map = self.vector_store.index_to_docstore_id
+        return [
+            [docstore.search(id_map[i]) for i in row if i != -1]
+            for row in indices
+        ]
+
+    def embed(self, text: str) -> List[float]:
+        """
+        L2-normalized query embedding, shared with the retrieve cache
+        """
+        return list(self._embed_query_cached(_QueryKey(text)))
+
     def retrieve_relevant_docs(self, query: str, top_k: int = 5) -> List[str]:
-        docs = self.vector_store.similarity_search(query, k=top_k)
+        vector = list(self._embed_query_cached(_QueryKey(query)))
+        docs = self._search_by_vectors([vector], k=top_k)[0]
         return [doc.page_content for doc in docs]
 
     def generate_response(self, query: str, context_docs: List[str]) -> str:
@@ -128,18 +673,60 @@ class LLMRAGModule:
         response = self.llm.invoke(messages)
         return response.content
 
+    def _batch_prompts(self, texts: List[str], top_k: int) -> list:
+        # One embedder forward and one FAISS search for every query
+        vectors = self.embeddings.embed_documents(texts)
+        prompts = []
+        for text, docs in zip(texts, self._search_by_vectors(vectors, k=top_k)):
+            docs_content = "\n\n".join(doc.page_content for doc in docs)
+            # Same messages generate() sends, so batch answers match chat()
+            prompts.append([
+                SystemMessage(content=_GENERATE_SYSTEM_PREFIX + docs_content),
+                SystemMessage(content=_CALL_SYSTEM_MESSAGE),
+                HumanMessage(content=text),
+            ])
+        return prompts
+
+    def chat_batch(self, texts: List[str], top_k: int = 2) -> List[str]:
+        """
+        Stateless batched chat: all queries are embedded in one forward pass,
+        then answered with concurrent LLM calls. No conversation memory is kept.
+        """
+        if not texts:
+            return []
+        try:
+            responses = self.llm.batch(self._batch_prompts(texts, top_k))
+            return [response.content for response in responses]
+        except Exception as e:
+            print(f"[Chat batch error] {e}")
+            return ["Error occurred during chat"] * len(texts)
+
+    async def achat_batch(self, texts: List[str], top_k: int = 2) -> List[str]:
+        """
+        Async variant of chat_batch(); the LLM calls go through the async client.
+        """
+        if not texts:
+            return []
+        try:
+            prompts = await asyncio.to_thread(self._batch_prompts, texts, top_k)
+            responses = await self.llm.abatch(prompts)
+            return [response.content for response in responses]
+        except Exception as e:
+            print(f"[Chat batch error] {e}")
+            return ["Error occurred during chat"] * len(texts)
+
+    def _chat_input(self, user_input: str) -> dict:
+        return {
+            "messages": [
+                {"role": "system", "content": _CALL_SYSTEM_MESSAGE},
+                {"role": "user", "content": user_input}
+            ]
+        }
+
     def chat(self, user_input: str, session_id: str = "default-thread") -> str:
         try:
             for step in self.graph.stream(
-                {
-                    "messages": [
-                        {
-                            "role": "system",
-                            "content": "You are on a phone call. Respond in natural spoken Korean. Be brief and clear. Do not make mistakes."
-                        },
-                        {"role": "user", "content": user_input}
-                    ]
-                },
+                self._chat_input(user_input),
                 config={"configurable": {"thread_id": session_id}},
                 stream_mode="values",
             ):
@@ -149,4 +736,22 @@ class LLMRAGModule:
             print(f"[Chat error] {e}")
             return "Error occurred during chat"
 
-
+    async def chat_stream(self, user_input: str, session_id: str = "default-thread"):
+        """
+        Same as chat(), but yields the answer token by token as the LLM
+        generates it. Tool-call chunks and tool outputs are skipped.
+        """
+        try:
+            async for msg_chunk, metadata in self.graph.astream(
+                self._chat_input(user_input),
+                config={"configurable": {"thread_id": session_id}},
+                stream_mode="messages",
+            ):
+                if (
+                    metadata.get("langgraph_node") in ("query_or_respond", "generate")
+                    and isinstance(msg_chunk, AIMessageChunk)
+                    and msg_chunk.content
+                ):
+                    yield msg_chunk.content
+        except Exception as e:
+            print(f"[Chat stream error] {e}")
@@ -0,0 +1,224 @@
+"""
+Notion Module - Incremental importer for a Notion knowledge database
+
+Input: Notion database id (string), integration token (NOTION_TOKEN in .env)
+Output: Plain-text page contents handed to a document sink (e.g. add_knowledge_documents)
+"""
+
+import asyncio
+import os
+import sqlite3
+from typing import Callable, List, Optional
+
+import aiohttp
+from dotenv import load_dotenv
+
+NOTION_API_URL = "https://api.notion.com/v1"
+NOTION_VERSION = "2022-06-28"
+
+# Rate-limited (429) and server-error responses are retried this many times
+MAX_RETRIES = 5
+
+# Block types whose rich_text is rendered, with the line prefix used for each
+_TEXT_BLOCK_PREFIXES = {
+    "paragraph": "",
+    "heading_1": "# ",
+    "heading_2": "## ",
+    "heading_3": "### ",
+    "bulleted_list_item": "- ",
+    "numbered_list_item": "1. ",
+    "to_do": "- [ ] ",
+    "toggle": "",
+    "quote": "> ",
+    "callout": "",
+    "code": "",
+}
+
+
+def _plain_text(rich_text: list) -> str:
+    return "".join(part.get("plain_text", "") for part in rich_text)
+
+
+class NotionImporter:
+    def __init__(self, token: Optional[str] = None, state_path: str = "./index/notion_sync.sqlite",
+                 max_concurrency: int = 32):
+        """
+        Initialize the Notion importer
+
+        Args:
+        - token: Notion integration token (if not using the NOTION_TOKEN environment variable)
+        - state_path: SQLite file holding the sync state: a per-database
+          last_edited_time watermark and the edit time of every imported page
+        - max_concurrency: maximum simultaneous Notion API requests (rate-limit guard)
+        """
+        load_dotenv(dotenv_path=".env")
+        self.token = token or os.getenv("NOTION_TOKEN")
+        self.state_path = state_path
+        self.max_concurrency = max_concurrency
+        os.makedirs(os.path.dirname(state_path) or ".", exist_ok=True)
+        with sqlite3.connect(state_path) as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sync_state (database_id TEXT PRIMARY KEY, last_edited_time TEXT)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS pages (database_id TEXT, page_id TEXT, last_edited_time TEXT, "
+                "PRIMARY KEY (database_id, page_id))"
+            )
+
+    def _get_watermark(self, database_id: str) -> Optional[str]:
+        with sqlite3.connect(self.state_path) as conn:
+            row = conn.execute(
+                "SELECT last_edited_time FROM sync_state WHERE database_id = ?", (database_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def _imported_versions(self, database_id: str, page_ids: List[str]) -> dict:
+        """
+        page id => last_edited_time of the version already imported
+        """
+        with sqlite3.connect(self.state_path) as conn:
+            rows = conn.execute(
+                f"SELECT page_id, last_edited_time FROM pages WHERE database_id = ? "
+                f"AND page_id IN ({', '.join('?' * len(page_ids))})",
+                (database_id, *page_ids),
+            ).fetchall()
+        return dict(rows)
+
+    def _record_import(self, database_id: str, pages: List[dict]):
+        # Page versions and the watermark are committed together
+        with sqlite3.connect(self.state_path) as conn:
+            conn.executemany(
+                "INSERT INTO pages (database_id, page_id, last_edited_time) VALUES (?, ?, ?) "
+                "ON CONFLICT(database_id, page_id) DO UPDATE SET last_edited_time = excluded.last_edited_time",
+                [(database_id, page["id"], page["last_edited_time"]) for page in pages],
+            )
+            conn.execute(
+                "INSERT INTO sync_state (database_id, last_edited_time) VALUES (?, ?) "
+                "ON CONFLICT(database_id) DO UPDATE SET last_edited_time = excluded.last_edited_time",
+                (database_id, pages[-1]["last_edited_time"]),
+            )
+
+    async def _request(self, session: aiohttp.ClientSession, semaphore: asyncio.Semaphore,
+                       method: str, path: str, **kwargs) -> dict:
+        """
+        One API call. Notion allows about 3 requests per second and answers
+        429 with Retry-After beyond that; throttled and 5xx responses are
+        retried after Retry-After (or an exponential backoff) instead of
+        failing the whole sync.
+        """
+        for attempt in range(MAX_RETRIES + 1):
+            async with semaphore:
+                async with session.request(method, f"{NOTION_API_URL}{path}", **kwargs) as response:
+                    retry = response.status == 429 or response.status >= 500
+                    if not retry or attempt == MAX_RETRIES:
+                        response.raise_for_status()
+                        return await response.json()
+                    try:
+                        delay = float(response.headers.get("Retry-After", ""))
+                    except ValueError:
+                        delay = 2 ** attempt
+            # Wait without holding a concurrency slot
+            await asyncio.sleep(delay)
+
+    async def _query_changed_pages(self, session, semaphore, database_id: str, since: Optional[str]):
+        """
+        Yield lists of pages edited at or after `since`, oldest first, one list
+        per API result page. last_edited_time is truncated to the minute, so a
+        strict "after" would lose edits made in the watermark's own minute;
+        pages already imported at that time are filtered out by the caller.
+        """
+        body = {"sorts": [{"timestamp": "last_edited_time", "direction": "ascending"}], "page_size": 100}
+        if since:
+            body["filter"] = {"timestamp": "last_edited_time", "last_edited_time": {"on_or_after": since}}
+        while True:
+            data = await self._request(session, semaphore, "POST", f"/databases/{database_id}/query", json=body)
+            yield data["results"]
+            if not data.get("has_more"):
+                return
+            body["start_cursor"] = data["next_cursor"]
+
+    async def _block_lines(self, session, semaphore, block_id: str) -> List[str]:
+        """
+        Text lines of a block's children, recursing into nested blocks
+        """
+        blocks, cursor = [], None
+        while True:
+            params = {"page_size": 100}
+            if cursor:
+                params["start_cursor"] = cursor
+            data = await self._request(session, semaphore, "GET", f"/blocks/{block_id}/children", params=params)
+            blocks.extend(data["results"])
+            if not data.get("has_more"):
+                break
+            cursor = data["next_cursor"]
+
+        # Nested children of sibling blocks are fetched concurrently
+        children = await asyncio.gather(*(
+            self._block_lines(session, semaphore, block["id"]) if block.get("has_children") else asyncio.sleep(0, [])
+            for block in blocks
+        ))
+        lines = []
+        for block, child_lines in zip(blocks, children):
+            block_type = block["type"]
+            if block_type in _TEXT_BLOCK_PREFIXES:
+                text = _plain_text(block[block_type].get("rich_text", []))
+                if text:
+                    lines.append(_TEXT_BLOCK_PREFIXES[block_type] + text)
+            lines.extend(child_lines)
+        return lines
+
+    async def _page_text(self, session, semaphore, page: dict) -> str:
+        title = ""
+        for prop in page.get("properties", {}).values():
+            if prop.get("type") == "title":
+                title = _plain_text(prop["title"])
+                break
+        lines = await self._block_lines(session, semaphore, page["id"])
+        return "\n".join(([f"# {title}"] if title else []) + lines)
+
+    async def sync(self, database_id: str, add_documents: Callable[[list, list], bool]) -> int:
+        """
+        Fetch every page edited since the last sync and pass their text to
+        add_documents, one API result page (up to 100 pages) at a time
+
+        Page bodies are fetched concurrently. Pages are processed oldest
+        edit first and the sync state advances after each successful batch, so
+        an interrupted sync resumes where it stopped. Documents are keyed by
+        Notion page id, so an edited page replaces its earlier version.
+
+        Args:
+        - database_id: Notion database id
+        - add_documents: sink for (page texts, page ids), returning success (bool)
+
+        Returns:
+        - number of pages imported
+        """
+        if not self.token:
+            raise ValueError("Notion token not set (NOTION_TOKEN)")
+        headers = {
+            "Authorization": f"Bearer {self.token}",
+            "Notion-Version": NOTION_VERSION,
+            "Content-Type": "application/json",
+        }
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        imported = 0
+        async with aiohttp.ClientSession(headers=headers) as session:
+            since = self._get_watermark(database_id)
+            async for pages in self._query_changed_pages(session, semaphore, database_id, since):
+                if not pages:
+                    continue
+                imported_versions = self._imported_versions(database_id, [page["id"] for page in pages])
+                changed = [
+                    page for page in pages
+                    if imported_versions.get(page["id"]) != page["last_edited_time"]
+                ]
+                texts = await asyncio.gather(*(self._page_text(session, semaphore, page) for page in changed))
+                documents = [(page["id"], text) for page, text in zip(changed, texts) if text.strip()]
+                # Embedding is CPU/GPU bound; run it off the event loop
+                if documents and not await asyncio.to_thread(
+                    add_documents, [text for _, text in documents], [page_id for page_id, _ in documents]
+                ):
+                    raise RuntimeError("Adding Notion pages to the knowledge base failed")
+                self._record_import(database_id, pages)
+                imported += len(documents)
+        return imported
@@ -1,28 +1,101 @@
 """
-Speech-to-Text (STT) Module - Based on OpenAI Whisper
+Speech-to-Text (STT) Module - Based on faster-whisper (CTranslate2 Whisper)
 Voice to text conversion module
 
 Input: Audio file path (string) or audio byte data (bytes)
 Output: Transcribed text result (string)
 """
 
-import whisper
+from faster_whisper import BatchedInferencePipeline, WhisperModel, decode_audio
+import av
+import numpy as np
 import sounddevice as sd
+import webrtcvad
 import os
-from scipy.io.wavfile import write
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from typing import Union, Optional
 
 
+WHISPER_SAMPLE_RATE = 16000
+# Length of one Whisper input window
+WHISPER_CHUNK_SECONDS = 30
+
+# Loaded Whisper weights shared by every STTModule, keyed by (model_size, compute_type)
+_WHISPER_CACHE: dict = {}
+_WHISPER_CACHE_LOCK = threading.Lock()
+
+
+def _load_whisper(model_size: str, compute_type: str) -> WhisperModel:
+    key = (model_size, compute_type)
+    with _WHISPER_CACHE_LOCK:
+        if key not in _WHISPER_CACHE:
+            _WHISPER_CACHE[key] = WhisperModel(model_size, device="auto", compute_type=compute_type)
+        return _WHISPER_CACHE[key]
+
+
+def probe_duration(audio_file_path: str) -> float:
+    """
+    Read the duration of an audio file from its container header, without decoding
+    
+    Input:
+    - audio_file_path: Audio file path (string, any format ffmpeg reads: .wav, .m4a, .mp3 etc.)
+    
+    Output:
+    - Duration in seconds (float, 0.0 if the container does not report one)
+    """
+    with av.open(audio_file_path) as container:
+        if container.duration is not None:
+            return container.duration / av.time_base
+        stream = container.streams.audio[0]
+        return float(stream.duration * stream.time_base) if stream.duration else 0.0
+
+
+def load_audio(audio_file_path: str) -> np.ndarray:
+    """
+    Read and decode an audio file into Whisper's input format
+    
+    Input:
+    - audio_file_path: Audio file path (string)
+    
+    Output:
+    - Mono float32 samples at 16 kHz (numpy array)
+    """
+    return decode_audio(audio_file_path, sampling_rate=WHISPER_SAMPLE_RATE)
+
+
 class STTModule:
-    def __init__(self, model_size: str = "small"):
+    def __init__(self, model_size: str = "small", compute_type: str = "int8"):
         """
         Initialize STT module
         
         Input parameters:
         - model_size: Whisper model size ("tiny", "base", "small", "medium", "large")
+        - compute_type: CTranslate2 compute type ("int8", "int8_float16", "float16", "float32")
         """
-        self.model = whisper.load_model(model_size)
+        self.model = _load_whisper(model_size, compute_type)
+        self.batched_model = BatchedInferencePipeline(model=self.model)
+        # Microphone buffer reused across record_and_transcribe calls; grown on demand
+        self._record_buffer = np.empty((0, 1), dtype=np.float32)
         
+    def _transcribe(self, audio, language: str) -> str:
+        segments, _ = self.model.transcribe(audio, language=language, beam_size=1, vad_filter=True)
+        return "".join(segment.text for segment in segments)
+        
+    def warmup(self, language: str = "ko"):
+        """
+        Run one decode over 1 s of silence so the first real request does not
+        pay for weight loading and kernel initialization
+
+        VAD is disabled here; it would drop the silence before the decoder runs.
+        """
+        silence = np.zeros(WHISPER_SAMPLE_RATE, dtype=np.float32)
+        segments, _ = self.model.transcribe(silence, language=language, beam_size=1, vad_filter=False)
+        for _ in segments:
+            pass
+
     def transcribe_from_file(self, audio_file_path: str, language: str = "ko") -> str:
         """
         Transcribe text from audio file - Based on original STTdemo code
@@ -38,22 +111,51 @@ class STTModule:
             raise FileNotFoundError(f"Audio file not found: {audio_file_path}")
 
         try:
-            result = self.model.transcribe(audio_file_path, language=language)
-            return result["text"]
+            return self._transcribe(audio_file_path, language)
         except Exception as e:
             print(f"STT transcription error: {e}")
             return ""
     
+    def transcribe_from_file_stream(self, audio_file_path: str, language: str = "ko"):
+        """
+        Transcribe audio file segment by segment
+        
+        faster-whisper decodes lazily, so each segment is yielded as soon as it
+        is decoded instead of after the whole file.
+        
+        Input:
+        - audio_file_path: Audio file path (string)
+        - language: Language recognition code (string)
+        
+        Output:
+        - Generator of transcribed segment texts (strings)
+        """
+        if not os.path.exists(audio_file_path):
+            raise FileNotFoundError(f"Audio file not found: {audio_file_path}")
+
+        try:
+            segments, _ = self.model.transcribe(
+                audio_file_path, language=language, beam_size=1, vad_filter=True
+            )
+            for segment in segments:
+                yield segment.text
+        except Exception as e:
+            print(f"STT transcription error: {e}")
+    
     def record_and_transcribe(self, duration: int = 5, sample_rate: int = 16000, 
-                             language: str = "ko", output_file: str = "recorded.wav") -> str:
+                             language: str = "ko") -> str:
         """
         Record and transcribe
         
+        The recording stays in memory and is fed to Whisper as a float32 array,
+        no temporary WAV file is written. Samples are recorded straight into a
+        float32 buffer that is reused by later calls, so a live loop does not
+        allocate a new recording (plus its int16 => float32 copy) every turn.
+        
         Input:
         - duration: Recording duration (seconds) (int)
-        - sample_rate: Sample rate (int, default 16000Hz)
+        - sample_rate: Sample rate (int, default 16000Hz, Whisper's native rate)
         - language: Language recognition code (string)
-        - output_file: Temporary audio filename (string)
         
         Output:
         - Transcribed text content (string)
@@ -61,55 +163,229 @@ class STTModule:
         try:
             print(f"Starting recording for {duration} seconds...")
             # Recording
-            recording = sd.rec(int(duration * sample_rate), 
+            frames = int(duration * sample_rate)
+            recording = sd.rec(frames, 
                              samplerate=sample_rate, 
                              channels=1, 
-                             dtype='int16')
+                             dtype='float32',
+                             out=self._capture_buffer(frames)[:frames])
             sd.wait()  # Wait for recording completion
             
-            # Save audio file
-            write(output_file, sample_rate, recording)
             print("Recording completed, starting transcription...")
+            # View into the reused buffer; transcription finishes before the next call
+            audio = recording[:, 0]
+            if sample_rate != WHISPER_SAMPLE_RATE:
+                # Whisper expects 16 kHz input when given a raw array
+                target_length = int(len(audio) * WHISPER_SAMPLE_RATE / sample_rate)
+                audio = np.interp(
+                    np.linspace(0, len(audio) - 1, target_length),
+                    np.arange(len(audio)),
+                    audio,
+                ).astype(np.float32)
             
             # Transcription
-            result = self.model.transcribe(output_file, language=language)
-            
-            # Clean up temporary files
-            if os.path.exists(output_file):
-                os.remove(output_file)
-                
-            return result["text"]
+            return self._transcribe(audio, language)
             
         except Exception as e:
             print(f"Recording transcription error: {e}")
             return ""
     
-    def transcribe_batch(self, audio_file_list: list, language: str = "ko") -> dict:
+    @staticmethod
+    def _is_speech(vad: webrtcvad.Vad, block: np.ndarray, frame_ms: int = 20) -> bool:
+        """
+        Majority vote of webrtcvad over the 20 ms frames of a 16 kHz float32 block
+        """
+        pcm = (np.clip(block, -1.0, 1.0) * 32767).astype(np.int16)
+        frame_len = WHISPER_SAMPLE_RATE * frame_ms // 1000
+        frames = [pcm[i:i + frame_len].tobytes() for i in range(0, len(pcm) - frame_len + 1, frame_len)]
+        voiced = sum(vad.is_speech(frame, WHISPER_SAMPLE_RATE) for frame in frames)
+        return voiced * 2 > len(frames)
+
+    def _capture_buffer(self, frames: int) -> np.ndarray:
         """
-        Batch transcribe audio files
+        The module's reusable float32 recording buffer, grown to at least frames
+        """
+        if len(self._record_buffer) < frames:
+            self._record_buffer = np.empty((frames, 1), dtype=np.float32)
+        return self._record_buffer
+
+    def listen_and_transcribe(self, max_duration: float = 5, language: str = "ko", block_ms: int = 200,
+                              pause_ms: int = 400, end_silence_ms: int = 800, vad_aggressiveness: int = 2):
+        """
+        Record from the microphone and transcribe while still recording
+        
+        The input stream callback writes each 200 ms block straight into the
+        module's preallocated recording buffer (shared with
+        record_and_transcribe) and queues only its bounds. Every stretch of
+        speech followed by a short pause (pause_ms) is handed to a decoder
+        thread right away as a view into that buffer, with no per-block copy
+        or per-phrase concatenation. Recording stops once the speaker has been
+        silent for end_silence_ms (or after max_duration), so neither the fixed
+        recording budget nor the decode of earlier phrases is waited on.
+        
+        Input:
+        - max_duration: Maximum recording duration (seconds) (float)
+        - language: Language recognition code (string)
+        - block_ms: Capture block length (ms, a multiple of 20)
+        - pause_ms: Silence that closes a phrase and sends it to the decoder (ms)
+        - end_silence_ms: Silence after speech that ends the recording (ms)
+        - vad_aggressiveness: webrtcvad mode, 0 (lenient) to 3 (strict)
+        
+        Output:
+        - Generator of transcribed phrase texts (string), in spoken order
+        """
+        block_size = WHISPER_SAMPLE_RATE * block_ms // 1000
+        # The whole turn fits, so each turn restarts at offset 0 and a phrase
+        # is always one contiguous slice
+        capacity = int(max_duration * WHISPER_SAMPLE_RATE)
+        buffer = self._capture_buffer(capacity)[:, 0]
+        blocks = deque()  # (start, end) offsets of captured blocks; append / popleft are thread-safe
+        write_pos = 0
+        
+        def on_block(indata, frames, time_info, status):
+            nonlocal write_pos
+            count = min(frames, capacity - write_pos)
+            if count > 0:
+                buffer[write_pos:write_pos + count] = indata[:count, 0]
+                blocks.append((write_pos, write_pos + count))
+                write_pos += count
+        
+        vad = webrtcvad.Vad(vad_aggressiveness)
+        decoder = ThreadPoolExecutor(max_workers=1)
+        decoding = deque()
+        phrase_start = phrase_end = None
+        has_speech = False
+        previous_start = None  # kept as left context for a phrase's first syllable
+        silence_ms = 0
+        heard = False
+        
+        def flush():
+            nonlocal phrase_start, phrase_end, has_speech
+            if has_speech:
+                decoding.append(decoder.submit(self._transcribe, buffer[phrase_start:phrase_end], language))
+            phrase_start = phrase_end = None
+            has_speech = False
+        
+        try:
+            print(f"Listening for up to {max_duration} seconds...")
+            with sd.InputStream(samplerate=WHISPER_SAMPLE_RATE, channels=1, dtype="float32",
+                                blocksize=block_size, callback=on_block):
+                while True:
+                    while decoding and decoding[0].done():
+                        yield decoding.popleft().result()
+                    if not blocks:
+                        if write_pos >= capacity:
+                            break
+                        time.sleep(block_ms / 4000)
+                        continue
+                    start, end = blocks.popleft()
+                    
+                    if self._is_speech(vad, buffer[start:end]):
+                        if phrase_start is None:
+                            phrase_start = previous_start if previous_start is not None else start
+                        phrase_end = end
+                        has_speech = heard = True
+                        silence_ms = 0
+                    elif heard:
+                        silence_ms += block_ms
+                        if phrase_start is not None:
+                            phrase_end = end
+                        if silence_ms >= pause_ms:
+                            flush()
+                        if silence_ms >= end_silence_ms:
+                            break
+                    previous_start = start
+            print("Recording completed")
+            flush()
+            while decoding:
+                yield decoding.popleft().result()
+        except Exception as e:
+            print(f"Live transcription error: {e}")
+        finally:
+            # Decodes read the shared buffer; let them finish before it is reused
+            decoder.shutdown(wait=True, cancel_futures=True)
+    
+    def transcribe_batch(self, audio_file_list: list, language: str = "ko", batch_size: int = 16) -> dict:
+        """
+        Batch transcribe audio files (decoded, then see transcribe_audio_batch)
         
         Input:
         - audio_file_list: List of audio file paths (list of strings)
         - language: Language recognition code (string)
+        - batch_size: Number of audio chunks per batched forward pass (int)
         
         Output:
         - Dictionary of filenames and transcription results (dict: {filename: transcribed_text})
         """
         results = {}
         try:
+            existing = []
             for audio_file in audio_file_list:
                 if os.path.exists(audio_file):
-                    result = self.model.transcribe(audio_file, language=language)
-                    results[audio_file] = result["text"]
+                    existing.append(audio_file)
                 else:
                     results[audio_file] = "File not found"
-                    
+            texts = self.transcribe_audio_batch([load_audio(f) for f in existing], language, batch_size)
+            results.update(zip(existing, texts))
             return results
             
         except Exception as e:
             print(f"Batch transcription error: {e}")
             return {}
-
+    
+    def transcribe_audio_batch(self, audio_list: list, language: str = "ko", batch_size: int = 16) -> list:
+        """
+        Batch transcribe already decoded audio (e.g. prefetched with load_audio)
+        
+        BatchedInferencePipeline only batches the chunks of the one audio it
+        is given, so clips up to one Whisper window (30 s) are concatenated and
+        passed with one clip_timestamps entry per file: different files then
+        share each batch_size-wide forward pass. Longer recordings are split
+        by VAD and batched on their own.
+        
+        Input:
+        - audio_list: List of 16 kHz float32 sample arrays (list of numpy arrays)
+        - language: Language recognition code (string)
+        - batch_size: Number of audio chunks per batched forward pass (int)
+        
+        Output:
+        - List of transcribed texts in input order ("" where transcription failed)
+        """
+        results = [""] * len(audio_list)
+        window = WHISPER_CHUNK_SECONDS * WHISPER_SAMPLE_RATE
+        short = [i for i, audio in enumerate(audio_list) if 0 < len(audio) <= window]
+        long = [i for i, audio in enumerate(audio_list) if len(audio) > window]
+        
+        if short:
+            try:
+                # Clip bounds are seconds into the concatenated audio
+                offsets = np.cumsum([0] + [len(audio_list[i]) for i in short])
+                bounds = offsets / WHISPER_SAMPLE_RATE
+                clips = [{"start": float(bounds[j]), "end": float(bounds[j + 1])} for j in range(len(short))]
+                segments, _ = self.batched_model.transcribe(
+                    np.concatenate([audio_list[i] for i in short]),
+                    language=language,
+                    batch_size=batch_size,
+                    vad_filter=False,
+                    clip_timestamps=clips,
+                )
+                parts = [[] for _ in short]
+                for segment in segments:
+                    # A segment starts inside the clip that produced it
+                    j = int(np.searchsorted(offsets, segment.start * WHISPER_SAMPLE_RATE + 1, side="right")) - 1
+                    parts[min(max(j, 0), len(short) - 1)].append(segment.text)
+                for j, i in enumerate(short):
+                    results[i] = "".join(parts[j])
+            except Exception as e:
+                print(f"Batch transcription error: {e}")
+        
+        for i in long:
+            try:
+                segments, _ = self.batched_model.transcribe(audio_list[i], language=language, batch_size=batch_size)
+                results[i] = "".join(segment.text for segment in segments)
+            except Exception as e:
+                print(f"Batch transcription error: {e}")
+        return results
 
 def demo():
     """
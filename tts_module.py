@@ -3,12 +3,112 @@ Text-to-Speech (TTS) Module using OpenAI API
 """
 
 from typing import Optional, Union
+import io
 import os
+import queue
+import threading
+import wave
+import asyncio
+import aiofiles
 import openai
+import sounddevice as sd
 from pathlib import Path
 from dotenv import load_dotenv
+from cache_module import AudioCache
+# OpenAI's "pcm" response format: raw 24 kHz, 16-bit signed little-endian, mono
+PCM_SAMPLE_RATE = 24000
+STREAM_CHUNK_SIZE = 8192
+PCM_SAMPLE_WIDTH = 2
+
+
+def _split_frames(buffer: bytes) -> tuple:
+    """
+    Split a PCM buffer into whole 16-bit frames and the leftover byte, since
+    HTTP chunks may end in the middle of a sample
+
+    Returns:
+    - (whole frames, remainder)
+    """
+    usable = len(buffer) - len(buffer) % PCM_SAMPLE_WIDTH
+    return buffer[:usable], buffer[usable:]
+
+
+class PCMTee:
+    """
+    Sink for streamed PCM audio that plays it on the default output device
+    and, optionally, records the same frames to a WAV file.
+
+    Device writes block at playback speed, so they run on a background thread;
+    write() only queues, and never stalls the producer (e.g. the event loop).
+    Playback starts once prebuffer_ms of audio is queued, which absorbs the
+    gaps between sentence requests. Use `async with` from async code so the
+    final drain does not block the loop.
+    """
+
+    def __init__(self, output_file: Optional[str] = None, prebuffer_ms: int = 200):
+        self.output_file = output_file
+        self.prebuffer_bytes = PCM_SAMPLE_RATE * PCM_SAMPLE_WIDTH * prebuffer_ms // 1000
+        self._wav = None
+        self._frames = queue.Queue()
+        self._remainder = b""
+        self._error = None
+        self._player = threading.Thread(target=self._play, daemon=True)
+
+    def _play(self):
+        # Device errors would otherwise die with this thread; __exit__ re-raises them
+        try:
+            self._play_frames()
+        except Exception as e:
+            self._error = e
+
+    def _play_frames(self):
+        prebuffer = bytearray()
+        while len(prebuffer) < self.prebuffer_bytes and (frames := self._frames.get()) is not None:
+            prebuffer += frames
+        with sd.RawOutputStream(samplerate=PCM_SAMPLE_RATE, channels=1, dtype="int16") as player:
+            if prebuffer:
+                player.write(bytes(prebuffer))
+            if len(prebuffer) >= self.prebuffer_bytes:
+                while (frames := self._frames.get()) is not None:
+                    player.write(frames)
+
+    def __enter__(self):
+        if self.output_file:
+            self._wav = wave.open(self.output_file, "wb")
+            self._wav.setnchannels(1)
+            self._wav.setsampwidth(PCM_SAMPLE_WIDTH)
+            self._wav.setframerate(PCM_SAMPLE_RATE)
+        self._player.start()
+        return self
+
+    def write(self, chunk: bytes):
+        frames, self._remainder = _split_frames(self._remainder + chunk)
+        if frames:
+            if self._wav is not None:
+                self._wav.writeframes(frames)
+            self._frames.put(frames)
+
+    def __exit__(self, *exc):
+        # Let playback drain before closing, so the tail of the answer is heard
+        self._frames.put(None)
+        self._player.join()
+        if self._wav is not None:
+            self._wav.close()
+        if self._error is not None and exc[0] is None:
+            raise RuntimeError(f"Audio playback failed: {self._error}") from self._error
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, *exc):
+        # Draining blocks until playback ends; keep the event loop free meanwhile
+        return await asyncio.to_thread(self.__exit__, *exc)
+
+
 class TTSModule:
-    def __init__(self, api_key: Optional[str] = None, voice_model: str = "tts-1", voice: str = "nova"):
+    def __init__(self, api_key: Optional[str] = None, voice_model: str = "tts-1", voice: str = "nova",
+                 language: str = "ko", audio_cache: Optional[AudioCache] = None):
         """
         Initialize the TTS module
 
@@ -16,12 +116,38 @@ class TTSModule:
         - api_key: OpenAI API key (if not using environment variable)
         - voice_model: TTS model name ("tts-1", "tts-1-hd", etc.)
         - voice: Voice name ("alloy", "nova", "shimmer", etc.)
+        - language: Response language (not directly used, for future compatibility)
+        - audio_cache: optional AudioCache; repeated texts are then served from it
         """
         load_dotenv(dotenv_path=".env")
         openai.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        self._async_client = None
+        self._async_client_loop = None
         self.voice_model = voice_model
         self.voice = voice
-        self.language = "ko"  # Not directly used, for future compatibility
+        self.language = language
+        self.audio_cache = audio_cache
+
+    def _cache_key(self, text: str, response_format: str) -> Optional[str]:
+        if self.audio_cache is None:
+            return None
+        return AudioCache.key(text, self.voice_model, self.voice, self.language, response_format)
+
+    def _cached_to_file(self, key: Optional[str], output_file: str) -> bool:
+        """
+        Write the cached audio for key to output_file; False on a miss
+        """
+        audio = self.audio_cache.get(key) if key else None
+        if audio is None:
+            return False
+        with open(output_file, "wb") as f:
+            f.write(audio)
+        return True
+
+    def _file_to_cache(self, key: Optional[str], output_file: str):
+        if key:
+            with open(output_file, "rb") as f:
+                self.audio_cache.put(key, f.read())
 
     def text_to_speech_file(self, input_text: str, output_file: str = "output.mp3") -> str:
         """
@@ -35,21 +161,127 @@ class TTSModule:
         - output file path
         """
         try:
-            response = openai.audio.speech.create(
+            key = self._cache_key(input_text, "mp3")
+            if self._cached_to_file(key, output_file):
+                return output_file
+            # Stream straight to disk instead of buffering the whole response
+            with openai.audio.speech.with_streaming_response.create(
                 model=self.voice_model,
                 voice=self.voice,
                 input=input_text,
                 response_format="mp3"
-            )
+            ) as response:
+                response.stream_to_file(output_file)
+            self._file_to_cache(key, output_file)
 
-            with open(output_file, "wb") as f:
-                f.write(response.content)
+            return output_file
+        except Exception as e:
+            print(f"TTS file generation error: {e}")
+            return ""
+
+    @property
+    def async_client(self) -> openai.AsyncOpenAI:
+        """
+        AsyncOpenAI client bound to the running event loop. Its HTTP connection
+        pool cannot be reused across loops, so a new client is made per loop.
+        """
+        loop = asyncio.get_running_loop()
+        if self._async_client_loop is not loop:
+            self._async_client = openai.AsyncOpenAI(api_key=openai.api_key)
+            self._async_client_loop = loop
+        return self._async_client
+
+    async def atext_to_speech_file(self, input_text: str, output_file: str = "output.mp3") -> str:
+        """
+        Async variant of text_to_speech_file using the AsyncOpenAI client
+
+        Chunks are written with aiofiles as they arrive, so the batch's other
+        requests keep running while the file is written and the response is
+        never held in memory only to be flushed at the end. Cache hits are a
+        single write.
+
+        Returns:
+        - output file path
+        """
+        try:
+            key = self._cache_key(input_text, "mp3")
+            cached = self.audio_cache.get(key) if key else None
+            async with aiofiles.open(output_file, "wb") as f:
+                if cached is not None:
+                    await f.write(cached)
+                    return output_file
+                chunks = []
+                async with self.async_client.audio.speech.with_streaming_response.create(
+                    model=self.voice_model,
+                    voice=self.voice,
+                    input=input_text,
+                    response_format="mp3"
+                ) as response:
+                    async for chunk in response.iter_bytes(STREAM_CHUNK_SIZE):
+                        await f.write(chunk)
+                        if key:
+                            chunks.append(chunk)
+            if key:
+                self.audio_cache.put(key, b"".join(chunks))
 
             return output_file
         except Exception as e:
             print(f"TTS file generation error: {e}")
             return ""
 
+    async def awarmup(self, text: str = "hi"):
+        """
+        Open this loop's AsyncOpenAI client and its connection with one short
+        synthesis. The audio cache is bypassed on purpose: a cache hit would
+        never touch the client.
+        """
+        async with self.async_client.audio.speech.with_streaming_response.create(
+            model=self.voice_model,
+            voice=self.voice,
+            input=text,
+            response_format="pcm"
+        ) as response:
+            async for _ in response.iter_bytes(STREAM_CHUNK_SIZE):
+                pass
+
+    async def text_to_speech_stream_chunks(self, text: str, response_format: str = "mp3"):
+        """
+        Synthesize text and yield the audio bytes as they arrive
+
+        A request that fails before any audio arrives yields nothing; one that
+        fails partway raises, since the audio already yielded is truncated.
+
+        Args:
+        - text: text to convert
+        - response_format: audio format ("mp3", "pcm", "wav", etc.)
+
+        Returns:
+        - async generator of audio byte chunks
+        """
+        key = self._cache_key(text, response_format)
+        cached = self.audio_cache.get(key) if key else None
+        if cached is not None:
+            yield cached
+            return
+        try:
+            chunks = []
+            async with self.async_client.audio.speech.with_streaming_response.create(
+                model=self.voice_model,
+                voice=self.voice,
+                input=text,
+                response_format=response_format
+            ) as response:
+                async for chunk in response.iter_bytes(STREAM_CHUNK_SIZE):
+                    chunks.append(chunk)
+                    yield chunk
+            # Only complete responses are cached
+            if key:
+                self.audio_cache.put(key, b"".join(chunks))
+        except Exception as e:
+            if chunks:
+                raise
+            print(f"TTS stream generation error: {e}")
+
     def text_to_speech_bytes(self, text: str) -> bytes:
         """
         Convert text to speech and return audio as byte data
@@ -61,31 +293,120 @@ class TTSModule:
         - audio byte content
         """
         try:
-            response = openai.audio.speech.create(
+            buffer = io.BytesIO()
+            with openai.audio.speech.with_streaming_response.create(
                 model=self.voice_model,
                 voice=self.voice,
                 input=text,
                 response_format="mp3"
-            )
-            return response.content
+            ) as response:
+                for chunk in response.iter_bytes(STREAM_CHUNK_SIZE):
+                    buffer.write(chunk)
+            return buffer.getvalue()
         except Exception as e:
             print(f"TTS byte generation error: {e}")
             return b""
 
-    def batch_text_to_speech(self, text_list: list, output_dir: str = "./audio_output") -> dict:
+    def text_to_speech_stream_iter(self, text: str):
+        """
+        Synthesize text and yield raw PCM (24 kHz, 16-bit mono) as it arrives,
+        cut on whole-frame boundaries
+
+        Args:
+        - text: text to convert
+
+        Returns:
+        - generator of PCM byte chunks; API errors are raised to the caller
+        """
+        with openai.audio.speech.with_streaming_response.create(
+            model=self.voice_model,
+            voice=self.voice,
+            input=text,
+            response_format="pcm"
+        ) as response:
+            remainder = b""
+            for chunk in response.iter_bytes(STREAM_CHUNK_SIZE):
+                frames, remainder = _split_frames(remainder + chunk)
+                if frames:
+                    yield frames
+
+    def text_to_speech_stream(self, text: str, output_file: Optional[str] = None) -> bool:
+        """
+        Synthesize text and play it on the default output device while it is
+        still being received
+
+        Args:
+        - text: text to convert
+        - output_file: optional .wav path receiving the same audio
+
+        Returns:
+        - success status
+        """
+        try:
+            with PCMTee(output_file) as tee:
+                for frames in self.text_to_speech_stream_iter(text):
+                    tee.write(frames)
+            return True
+        except Exception as e:
+            print(f"TTS stream playback error: {e}")
+            return False
+
+    async def atext_to_speech_batch(self, text_list: list, output_files: list,
+                                    max_concurrency: int = 8) -> list:
+        """
+        Synthesize several texts with all requests in flight concurrently
+
+        Args:
+        - text_list: texts to convert
+        - output_files: output path for each text
+        - max_concurrency: maximum simultaneous API requests (rate-limit guard)
+
+        Returns:
+        - list of output file paths ("" where synthesis failed), in input order
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def _one_tts(text: str, filename: str) -> str:
+            async with semaphore:
+                return await self.atext_to_speech_file(text, filename)
+
+        return list(await asyncio.gather(*(
+            _one_tts(text, filename) for text, filename in zip(text_list, output_files)
+        )))
+
+    def text_to_speech_batch(self, text_list: list, output_files: list) -> list:
+        """
+        Sync wrapper around atext_to_speech_batch
+
+        Returns:
+        - list of output file paths, in input order
+        """
+        return asyncio.run(self.atext_to_speech_batch(text_list, output_files))
+
+    async def abatch_text_to_speech(self, text_list: list, output_dir: str = "./audio_output",
+                                    max_concurrency: int = 8) -> dict:
         """
-        Batch TTS processing
+        Batch TTS processing with all requests in flight concurrently
+
+        Args:
+        - max_concurrency: maximum simultaneous API requests (rate-limit guard)
 
         Returns:
         - dict of text => generated file path
         """
         os.makedirs(output_dir, exist_ok=True)
-        result = {}
-        for i, text in enumerate(text_list):
-            filename = os.path.join(output_dir, f"output_{i+1}.mp3")
-            path = self.text_to_speech_file(text, filename)
-            result[text] = path
-        return result
+        filenames = [os.path.join(output_dir, f"output_{i+1}.mp3") for i in range(len(text_list))]
+        paths = await self.atext_to_speech_batch(text_list, filenames, max_concurrency)
+        return dict(zip(text_list, paths))
+
+    def batch_text_to_speech(self, text_list: list, output_dir: str = "./audio_output") -> dict:
+        """
+        Batch TTS processing (sync wrapper around abatch_text_to_speech)
+
+        Returns:
+        - dict of text => generated file path
+        """
+        return asyncio.run(self.abatch_text_to_speech(text_list, output_dir))
 
     def set_voice_parameters(self, voice_model: Optional[str] = None, voice: Optional[str] = None):
         """
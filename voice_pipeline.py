@@ -12,23 +12,188 @@ This filcontains Voice Pipeline class and several functions, which includes:
 2. utilities：
     2.1 batch_process_audio_files
     2.2 add_knowledge_documents
-        this function can be optimized while it has the potential to read the notion knowledge database.
+    2.3 add_knowledge_from_notion (incremental import of a Notion knowledge database)
 """
 
-from stt_module import STTModule
+from stt_module import STTModule, load_audio, probe_duration
 from llm_rag_module import LLMRAGModule
-from tts_module import TTSModule
+from tts_module import PCMTee, TTSModule
+from cache_module import AudioCache, SemanticCache
+from notion_module import NotionImporter
 import os
+import re
+import asyncio
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import cached_property
+import atexit
+from dataclasses import asdict, dataclass
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+import numpy as np
 from tqdm import tqdm
 from typing import Optional
 import time
 
+# CTranslate2 compute type => ONNX embedder precision. Mixed types such as
+# "int8_float16" map to None, the embedder's own INT8-on-CPU / FP16-on-CUDA pick.
+_EMBEDDING_PRECISION = {
+    "int8": "int8",
+    "int8_float32": "int8",
+    "float16": "fp16",
+    "bfloat16": "fp16",
+    "float32": "fp32",
+}
+
+# Log records are only enqueued on the calling thread; formatting and the
+# stderr write happen on the listener thread
+_log_queue = queue.Queue(-1)
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(logging.Formatter("%(message)s"))
+_log_listener = QueueListener(_log_queue, _log_handler)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
+logger = logging.getLogger(__name__)
+logger.addHandler(QueueHandler(_log_queue))
+logger.setLevel(logging.INFO)
+logger.propagate = False
+
+
+@dataclass(slots=True)
+class PipelineResult:
+    """
+    Outcome of one request. Stages fill it in place; the public methods return
+    it as a plain dict (dataclasses.asdict) to keep their documented return type.
+    """
+    input_text: str = ""
+    response_text: str = ""
+    output_audio: str = ""
+    success: bool = False
+    input_file: str = ""
+
+
+# Module instances keyed by (class, constructor kwargs), kept for the life of
+# the process like the weight caches in stt_module / llm_rag_module, so every
+# pipeline with the same config reuses one loaded module
+_MODULE_REGISTRY: dict = {}
+_MODULE_REGISTRY_LOCK = threading.Lock()
+# Modules that already ran their warm-up pass
+_WARMED_MODULES: set = set()
+
+
+def _get_or_create(cls, **kwargs):
+    """
+    Return the registered cls(**kwargs) instance, building it on first use,
+    so pipelines with the same config share loaded weights
+    """
+    key = (cls, tuple(sorted(kwargs.items())))
+    with _MODULE_REGISTRY_LOCK:
+        if key not in _MODULE_REGISTRY:
+            logger.info("Loading %s(%s)...", cls.__name__, ", ".join(f"{k}={v!r}" for k, v in key[1]))
+            _MODULE_REGISTRY[key] = cls(**kwargs)
+        return _MODULE_REGISTRY[key]
+
+
+# A sentence is complete once its terminator is followed by whitespace
+_SENTENCE_END = re.compile(r"(?<=[.!?。！？])\s+")
+
+# Markup the LLM emits that should not be read aloud, matched in one pass:
+# markdown links (keep the label), bare URLs, heading / list markers, and
+# *emphasis* / **strong** / `code` spans (keep the text). Emphasis markers are
+# only stripped in pairs hugging text, so "2 * 3" or "__init__" are read as
+# written. Compiled once at import; re's alternation keeps this a single scan
+# per sentence, so no DFA engine (re2 / hyperscan) is needed.
+_SPEECH_MARKUP = re.compile(
+    r"\[(?P<label>[^\]]+)\]\([^)]*\)"
+    r"|https?://\S+"
+    r"|^\s*(?:#{1,6}|[-*+]|\d+\.)\s+"
+    r"|(?<![\w*])(?P<mark>\*\*|\*)(?P<emph>\S(?:.*?\S)?)(?P=mark)(?![\w*])"
+    r"|`(?P<code>[^`\n]+)`",
+    re.MULTILINE,
+)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _unmarkup(match: re.Match) -> str:
+    if match.group("emph") is not None:
+        # Emphasis may nest (**bold *and* italic**)
+        return _SPEECH_MARKUP.sub(_unmarkup, match.group("emph"))
+    return match.group("label") or match.group("code") or ""
+
+
+def _normalize_for_speech(text: str) -> str:
+    """
+    Strip markup and collapse whitespace before TTS, so the same spoken
+    sentence always maps to the same audio-cache key
+    """
+    text = _SPEECH_MARKUP.sub(_unmarkup, text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def _pop_sentences(buffer: str, min_words: int = 10) -> tuple:
+    """
+    Split the complete sentences off the front of a streamed text buffer
+    
+    Consecutive short sentences are merged until a chunk has at least
+    min_words words, so TTS is not called once per "Yes." or "Okay."; a
+    short tail is flushed by the caller when the stream ends.
+    
+    Returns:
+    - (list of sentence chunks, remaining text still to be chunked)
+    """
+    parts = _SENTENCE_END.split(buffer)
+    chunks, pending, pending_words = [], [], 0
+    for part in parts[:-1]:
+        part = part.strip()
+        if not part:
+            continue
+        pending.append(part)
+        pending_words += len(part.split())
+        if pending_words >= min_words:
+            chunks.append(" ".join(pending))
+            pending, pending_words = [], 0
+    return chunks, " ".join(pending + [parts[-1]])
+
+
+async def _prefetch_audio(paths: list, queue: asyncio.Queue, depth: int = 16):
+    """
+    Read and decode audio files in worker threads, keeping up to `depth`
+    files in flight, and put the decoded arrays on `queue` in path order
+    (None for files that failed to decode)
+    """
+    loop = asyncio.get_running_loop()
+    
+    def decode(path: str):
+        try:
+            return load_audio(path)
+        except Exception as e:
+            logger.error("Audio prefetch error: %s", e)
+            return None
+    
+    with ThreadPoolExecutor(max_workers=min(depth, os.cpu_count() or 1)) as executor:
+        in_flight = deque()
+        for path in paths:
+            in_flight.append(loop.run_in_executor(executor, decode, path))
+            if len(in_flight) >= depth:
+                await queue.put(await in_flight.popleft())
+        while in_flight:
+            await queue.put(await in_flight.popleft())
+
+
 class VoicePipeline:
     def __init__(self, 
                  stt_model_size: str = "large",
                  llm_model_name: str = "gpt-4o-mini",
                  tts_voice_model: str = "default",
-                 language: str = "ko"):
+                 language: str = "ko",
+                 warmup: bool = True,
+                 precision: str = "int8_float16",
+                 stt_precision: Optional[str] = None,
+                 embedding_precision: Optional[str] = None):
         """
         Initialize the voice processing pipeline
         
@@ -46,16 +211,98 @@ class VoicePipeline:
             
         - tts_voice_model: TTS voice model (string)
         - language: processing language (string)
+        - warmup: run one dummy request through every stage before returning (bool)
+        - precision: compute type for the local models (CTranslate2 name, e.g.
+          "int8_float16", "int8", "float16", "float32"); the LLM and TTS run
+          behind the OpenAI API and are not affected
+        - stt_precision: Whisper compute type, overriding precision (string)
+        - embedding_precision: RAG embedder precision ("int8", "fp16", "fp32"),
+          overriding precision (string)
         """
-        print("Initializing voice pipeline...")
-        
-        # Initialize the three modules
-        self.stt = STTModule(model_size=stt_model_size)
-        self.llm_rag = LLMRAGModule(model_name=llm_model_name)
-        self.tts = TTSModule(voice_model=tts_voice_model, language=language)
+        logger.info("Initializing voice pipeline...")
         
+        # The three modules are built on first access (see the properties below)
         self.language = language
-        print("Voice pipeline initialized successfully!")
+        # Constructor arguments, so worker processes can build an identical pipeline
+        self._config = {
+            "stt_model_size": stt_model_size,
+            "llm_model_name": llm_model_name,
+            "tts_voice_model": tts_voice_model,
+            "language": language,
+            "warmup": warmup,
+            "precision": precision,
+            "stt_precision": stt_precision,
+            "embedding_precision": embedding_precision,
+        }
+        # One long-lived loop for all async stages, so async clients keep their connections
+        self._loop = asyncio.new_event_loop()
+        if warmup:
+            self._warmup()
+        logger.info("Voice pipeline initialized successfully!")
+    
+    @cached_property
+    def stt(self) -> STTModule:
+        return _get_or_create(
+            STTModule,
+            model_size=self._config["stt_model_size"],
+            compute_type=self._config["stt_precision"] or self._config["precision"],
+        )
+    
+    @cached_property
+    def llm_rag(self) -> LLMRAGModule:
+        return _get_or_create(
+            LLMRAGModule,
+            model_name=self._config["llm_model_name"],
+            embedding_precision=(
+                self._config["embedding_precision"] or _EMBEDDING_PRECISION.get(self._config["precision"])
+            ),
+        )
+    
+    @cached_property
+    def tts(self) -> TTSModule:
+        # Repeated sentences (greetings, confirmations) are served from disk
+        return _get_or_create(
+            TTSModule,
+            voice_model=self._config["tts_voice_model"],
+            language=self.language,
+            audio_cache=_get_or_create(AudioCache),
+        )
+    
+    @cached_property
+    def _sem_cache(self) -> SemanticCache:
+        # Near-duplicate questions skip the LLM and TTS stages entirely
+        return SemanticCache(embedding_func=self.llm_rag.embed, similarity_threshold=0.92)
+    
+    def _warmup(self):
+        """
+        Send one dummy request through STT, LLM-RAG and TTS so model loading,
+        session setup and connection handshakes happen here and not on the
+        first real request. Modules shared with an earlier pipeline are
+        already warm and skipped.
+        
+        No CUDA graphs are captured: Whisper runs in CTranslate2, which owns its
+        kernel launches and has no graph-capture hook, and the LLM and TTS run
+        behind the OpenAI API. The warm-up decode uses the live path's settings
+        (beam_size=1, same compute type), so later calls reuse the allocations
+        it makes.
+        """
+        logger.info("Warming up pipeline...")
+        started = time.perf_counter()
+        try:
+            if self.stt not in _WARMED_MODULES:
+                self.stt.warmup(language=self.language)
+                _WARMED_MODULES.add(self.stt)
+            if self.llm_rag not in _WARMED_MODULES:
+                self.llm_rag.embed("warmup")
+                # Separate thread, so the warm-up turn stays out of the real conversation
+                self.llm_rag.chat("hi", session_id="warmup")
+                _WARMED_MODULES.add(self.llm_rag)
+            
+            # The TTS client is per event loop, so this runs for every pipeline
+            self._loop.run_until_complete(self.tts.awarmup())
+        except Exception as e:
+            logger.warning("Pipeline warm-up error: %s", e)
+        logger.info("Warm-up finished in %.1fs", time.perf_counter() - started)
     
     def process_audio_file(self, audio_file_path: str, output_audio_path: str = "response.wav") -> dict:
         """
@@ -73,54 +320,150 @@ class VoicePipeline:
             "success": status flag
         }
         """
-        result = {
-            "input_text": "",
-            "response_text": "",
-            "output_audio": "",
-            "success": False
-        }
+        return self._loop.run_until_complete(
+            self.process_audio_file_async(audio_file_path, output_audio_path)
+        )
+    
+    async def process_audio_file_async(self, audio_file_path: str,
+                                       output_audio_path: str = "response.wav") -> dict:
+        """
+        Async version of process_audio_file; STT, LLM-RAG and TTS run as
+        overlapping stages (see _run_stages)
+        """
+        result = PipelineResult()
         
         try:
-            print(f"Processing audio file: {audio_file_path}")
-            
-            # Step 1: STT - speech to text
-            print("1. Interpreting voice...")
-            input_text = self.stt.transcribe_from_file(audio_file_path, language=self.language)
-            if not input_text:
-                print("Speech recognition failed")
-                return result
-            
-            result["input_text"] = input_text
-            print(f"Recognized: {input_text}")
+            logger.info("Processing audio file: %s", audio_file_path)
+            logger.info("1. Interpreting voice...")
+            segments = self.stt.transcribe_from_file_stream(audio_file_path, language=self.language)
             
-            # Step 2: LLM-RAG - text understanding and response generation
-            print("2. Generating response...")
-            response_text = self.llm_rag.chat(input_text)
-            if not response_text:
-                print("Response generation failed")
-                return result
+            with open(output_audio_path, "wb") as f:
+                synthesized = await self._run_stages(segments, f.write, result)
+            if not synthesized:
+                return asdict(result)
                 
-            result["response_text"] = response_text
-            print(f"Response: {response_text}")
+            result.output_audio = output_audio_path
+            result.success = True
+            logger.info("Processing complete! Output audio: %s", output_audio_path)
             
-            # # Step 3: TTS - text to speech
-            print("3. Synthesizing speech...")
-            output_audio = self.tts.text_to_speech_file(response_text, output_audio_path)
-            if not output_audio:
-                print("Speech synthesis failed")
-                return result
+            return asdict(result)
+        except Exception as e:
+            logger.error("Voice pipeline processing error: %s", e)
+            return asdict(result)
+    
+    async def _run_stages(self, segments, write_audio, result: PipelineResult,
+                          response_format: str = "mp3") -> bool:
+        """
+        Producer/consumer pipeline: STT → LLM-RAG → TTS connected by queues
+        
+        - stt_task pulls transcript segments from a (blocking) generator in a
+          worker thread as they are decoded
+        - llm_task waits for the complete utterance, then streams the answer
+          and flushes it to TTS at every sentence boundary; a semantic cache hit
+          sends the stored answer's audio instead
+        - tts_task streams each sentence's audio into write_audio as it arrives,
+          while the LLM is still generating the next one
+        
+        Args:
+        - segments: iterable of transcript segments (strings)
+        - write_audio: callable receiving audio byte chunks in order
+        - result: PipelineResult, filled with input_text / response_text
+        - response_format: TTS audio format
+        
+        Returns:
+        - whether every sentence was synthesized
+        """
+        loop = asyncio.get_running_loop()
+        transcript_queue = asyncio.Queue()
+        sentence_queue = asyncio.Queue()  # sentences to synthesize, or ready audio bytes
+        audio_chunks = []
+        cache_hit = False
+        kb_version = 0
+        
+        # Each producer sends its end sentinel in `finally`, so a failing stage
+        # never leaves the next one waiting
+        async def stt_task():
+            try:
+                iterator = iter(segments)
+                while (segment := await loop.run_in_executor(None, next, iterator, None)) is not None:
+                    await transcript_queue.put(segment)
+            finally:
+                await transcript_queue.put(None)
+        
+        async def llm_task():
+            nonlocal cache_hit, kb_version
+            try:
+                parts = []
+                while (segment := await transcript_queue.get()) is not None:
+                    parts.append(segment)
+                input_text = "".join(parts).strip()
+                if not input_text:
+                    logger.warning("Speech recognition failed")
+                    return
+                result.input_text = input_text
+                logger.info("Recognized: %s", input_text)
                 
-            result["output_audio"] = output_audio
-            result["success"] = True
-            print(f"Processing complete! Output audio: {output_audio}")
+                logger.info("2. Generating response...")
+                kb_version = self.llm_rag.vector_store.version
+                cached = self._sem_cache.get(input_text, kb_version) if response_format == "mp3" else None
+                if cached is not None:
+                    cache_hit = True
+                    response_parts = [cached[0]]
+                    await sentence_queue.put(cached[1])
+                else:
+                    buffer = ""
+                    response_parts = []
+                    async for token in self.llm_rag.chat_stream(input_text):
+                        response_parts.append(token)
+                        sentences, buffer = _pop_sentences(buffer + token)
+                        for sentence in sentences:
+                            await sentence_queue.put(sentence)
+                    if buffer.strip():
+                        await sentence_queue.put(buffer.strip())
+            finally:
+                await sentence_queue.put(None)
             
-            # return result
-            # ==========================
-            # still developing..
-            # ==========================
-        except Exception as e:
-            print(f"Voice pipeline processing error: {e}")
-            return result
+            result.response_text = "".join(response_parts)
+            if result.response_text:
+                logger.info("Response: %s", result.response_text)
+            else:
+                logger.warning("Response generation failed")
+        
+        async def tts_task():
+            synthesized = None
+            while (item := await sentence_queue.get()) is not None:
+                if isinstance(item, bytes):
+                    write_audio(item)
+                    synthesized = True
+                    continue
+                item = _normalize_for_speech(item)
+                if not item:
+                    continue
+                received = False
+                try:
+                    async for chunk in self.tts.text_to_speech_stream_chunks(item, response_format):
+                        write_audio(chunk)
+                        audio_chunks.append(chunk)
+                        received = True
+                except Exception as e:
+                    # A stream that died partway left truncated audio
+                    logger.warning("Speech synthesis interrupted: %s", e)
+                    received = False
+                synthesized = received if synthesized is None else synthesized and received
+            return bool(synthesized)
+        
+        logger.info("3. Synthesizing speech...")
+        outcomes = await asyncio.gather(stt_task(), llm_task(), tts_task(), return_exceptions=True)
+        for outcome in outcomes:
+            if isinstance(outcome, BaseException):
+                raise outcome
+        synthesized = outcomes[2]
+        if result.response_text and not synthesized:
+            logger.warning("Speech synthesis failed")
+        elif synthesized and not cache_hit and response_format == "mp3":
+            # synthesized is only True when every sentence streamed to the end
+            self._sem_cache.put(result.input_text, result.response_text, b"".join(audio_chunks), kb_version)
+        return synthesized
     
     def process_live_conversation(self, record_duration: int = 5, 
                                 output_audio_path: str = "live_response.wav") -> dict:
@@ -128,101 +471,283 @@ class VoicePipeline:
         Real-time conversation processing - record, recognize, respond, playback
         
         Args:
-        - record_duration: recording duration in seconds (int)
+        - record_duration: maximum recording duration in seconds (int); recording
+          ends earlier once the speaker stops
         - output_audio_path: output audio path (string)
         
         Returns:
         - result dictionary (dict)
         """
-        result = {
-            "input_text": "",
-            "response_text": "",
-            "output_audio": "",
-            "success": False
-        }
+        return self._loop.run_until_complete(
+            self.process_live_conversation_async(record_duration, output_audio_path)
+        )
+    
+    async def process_live_conversation_async(self, record_duration: int = 5,
+                                              output_audio_path: str = "live_response.wav") -> dict:
+        """
+        Async version of process_live_conversation, using the same staged
+        pipeline as process_audio_file_async with the microphone as STT source.
+        The answer is synthesized once, as PCM, and each chunk is played and
+        written to output_audio_path (.wav) as it arrives.
+        """
+        result = PipelineResult()
         
         try:
-            print("Starting live conversation...")
-            
-            # Step 1: Record and transcribe
-            print("1. Please speak now...")
-            input_text = self.stt.record_and_transcribe(
-                duration=record_duration, 
-                language=self.language
-            )
-            if not input_text:
-                print("Recording recognition failed")
-                return result
-            
-            result["input_text"] = input_text
-            print(f"You said: {input_text}")
+            logger.info("Starting live conversation...")
             
-            # Step 2: Generate response
-            print("2. Thinking...")
-            response_text = self.llm_rag.chat(input_text)
-            if not response_text:
-                print("Response generation failed")
-                return result
-                
-            result["response_text"] = response_text
-            print(f"Response: {response_text}")
-            
-            # Step 3: Synthesize and play
-            print("3. Playing response...")
-            # Generate audio file
-            output_audio = self.tts.text_to_speech_file(response_text, output_audio_path)
-            result["output_audio"] = output_audio
+            def recorded():
+                logger.info("1. Please speak now...")
+                # Phrases arrive while the speaker is still talking
+                yield from self.stt.listen_and_transcribe(max_duration=record_duration, language=self.language)
             
-            # Attempt stream playback
-            self.tts.text_to_speech_stream(response_text)
+            async with PCMTee(output_audio_path) as tee:
+                synthesized = await self._run_stages(recorded(), tee.write, result, response_format="pcm")
+            if not synthesized:
+                return asdict(result)
+            result.output_audio = output_audio_path
             
-            result["success"] = True
-            print("Live conversation complete!")
+            result.success = True
+            logger.info("Live conversation complete!")
             
-            return result
+            return asdict(result)
             
         except Exception as e:
-            print(f"Live conversation error: {e}")
-            return result
+            logger.error("Live conversation error: %s", e)
+            return asdict(result)
     
-    def batch_process_audio_files(self, audio_files: list, output_dir: str = "./batch_output") -> list:
+    def batch_process_audio_files(self, audio_files: list, output_dir: str = "./batch_output",
+                                  batch_size: int = 8, workers: int = 1,
+                                  log_level: int = logging.WARNING) -> list:
         """
         Batch process audio files
         
         Args:
         - audio_files: list of audio file paths (List[string])
         - output_dir: output directory (string)
+        - batch_size: files per batched STT / LLM / TTS call (int)
+        - workers: number of worker processes (int). With 1 the batch runs in
+          this process as a batched pipeline; with more, files are spread over
+          a process pool where each worker loads its own models
+        - log_level: pipeline log level for the duration of the batch (int);
+          per-file progress is logged at INFO, so the default keeps it quiet
         
         Returns:
         - list of processing results (List[dict])
         """
-        results = []
-        
         # Ensure output directory exists
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
         
-        for i, audio_file in enumerate(audio_files):
-            print(f"\nProcessing file {i+1}/{len(audio_files)}: {audio_file}")
+        previous_level = logger.level
+        logger.setLevel(log_level)
+        try:
+            return self._batch_dispatch(audio_files, output_dir, batch_size, workers, log_level)
+        finally:
+            logger.setLevel(previous_level)
+    
+    def _batch_dispatch(self, audio_files: list, output_dir: str, batch_size: int,
+                        workers: int, log_level: int) -> list:
+        if workers > 1:
+            jobs = [
+                (audio_file, os.path.join(output_dir, f"response_{i+1}.wav"))
+                for i, audio_file in enumerate(audio_files)
+            ]
+            # spawn: CUDA and CTranslate2 state does not survive fork
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_worker_init,
+                initargs=(self._config, log_level),
+            ) as executor:
+                # map (not as_completed) keeps the input order
+                return list(executor.map(_worker_process, jobs))
+        
+        results = self._loop.run_until_complete(self._batch_pipeline(audio_files, output_dir, batch_size))
+        return [asdict(result) for result in results]
+    
+    async def _batch_pipeline(self, audio_files: list, output_dir: str, batch_size: int,
+                              prefetch_depth: int = 16) -> list:
+        """
+        Run batched STT, LLM-RAG and TTS as three overlapping stages linked by
+        queues, so batch i+1 is transcribed while batch i is being answered or
+        synthesized. Queue items are lists of indices into the result list,
+        which keeps the output order.
+        """
+        loop = asyncio.get_running_loop()
+        results = [PipelineResult(input_file=audio_file) for audio_file in audio_files]
+        llm_queue = asyncio.Queue()
+        tts_queue = asyncio.Queue()
+        
+        def probe_all(indices: list) -> tuple:
+            # A file whose header cannot be read is skipped, its result stays failed
+            probed, durations = [], []
+            for i in indices:
+                try:
+                    durations.append(probe_duration(audio_files[i]))
+                    probed.append(i)
+                except Exception as e:
+                    logger.warning("Audio probe failed: %s (%s)", audio_files[i], e)
+            return probed, durations
+        
+        # Each producer sends its end sentinel in `finally`, so a failing stage
+        # never leaves the next one waiting
+        async def stt_worker():
+            try:
+                await transcribe_all()
+            finally:
+                await llm_queue.put(None)
+        
+        async def transcribe_all():
+            # Sort by length, shortest first: short clips land in the same
+            # buckets, where transcribe_audio_batch packs them into shared
+            # forward passes, and long recordings end up together at the end
+            existing = []
+            for i, audio_file in enumerate(audio_files):
+                if os.path.exists(audio_file):
+                    existing.append(i)
+                else:
+                    logger.warning("Audio file not found: %s", audio_file)
+            probed, durations = await loop.run_in_executor(None, probe_all, existing)
+            order = [probed[j] for j in np.argsort(durations, kind="stable")]
             
-            output_audio = os.path.join(output_dir, f"response_{i+1}.wav")
-            result = self.process_audio_file(audio_file, output_audio)
-            result["input_file"] = audio_file
-            results.append(result)
+            # Files are read and decoded ahead of time while Whisper works
+            audio_queue = asyncio.Queue(maxsize=prefetch_depth)
+            prefetch = asyncio.create_task(
+                _prefetch_audio([audio_files[i] for i in order], audio_queue, prefetch_depth)
+            )
+            try:
+                await transcribe_ordered(order, audio_queue)
+            except BaseException:
+                prefetch.cancel()
+                raise
+            finally:
+                await asyncio.gather(prefetch, return_exceptions=True)
+        
+        async def transcribe(bucket: list, audios: list):
+            logger.info("Transcribing %d files", len(bucket))
+            # Whisper is blocking, keep it off the event loop
+            texts = await loop.run_in_executor(
+                None, self.stt.transcribe_audio_batch, audios, self.language
+            )
+            recognized = []
+            for i, text in zip(bucket, texts):
+                results[i].input_text = text
+                if text:
+                    recognized.append(i)
+                else:
+                    logger.warning("Speech recognition failed: %s", audio_files[i])
+            if recognized:
+                await llm_queue.put(recognized)
+        
+        async def transcribe_ordered(order: list, audio_queue: asyncio.Queue):
+            bucket, audios = [], []
+            for i in order:
+                audio = await audio_queue.get()
+                if audio is None:
+                    logger.warning("Audio decoding failed: %s", audio_files[i])
+                    continue
+                bucket.append(i)
+                audios.append(audio)
+                if len(bucket) == batch_size:
+                    await transcribe(bucket, audios)
+                    bucket, audios = [], []
+            if bucket:
+                await transcribe(bucket, audios)
+        
+        async def llm_worker():
+            try:
+                while (batch := await llm_queue.get()) is not None:
+                    responses = await self.llm_rag.achat_batch([results[i].input_text for i in batch])
+                    for i, response_text in zip(batch, responses):
+                        results[i].response_text = response_text
+                    await tts_queue.put(batch)
+            finally:
+                await tts_queue.put(None)
+        
+        async def tts_worker():
+            while (batch := await tts_queue.get()) is not None:
+                output_paths = [os.path.join(output_dir, f"response_{i+1}.wav") for i in batch]
+                output_audios = await self.tts.atext_to_speech_batch(
+                    [_normalize_for_speech(results[i].response_text) for i in batch], output_paths
+                )
+                for i, output_audio in zip(batch, output_audios):
+                    results[i].output_audio = output_audio
+                    results[i].success = bool(output_audio)
         
+        outcomes = await asyncio.gather(stt_worker(), llm_worker(), tts_worker(), return_exceptions=True)
+        for outcome in outcomes:
+            if isinstance(outcome, BaseException):
+                raise outcome
         return results
     
-    def add_knowledge_documents(self, documents: list) -> bool:
+    def add_knowledge_documents(self, documents: list, batch_size: int = 64,
+                                ids: Optional[list] = None) -> bool:
         """
         Add knowledge documents
         
+        Each slice of batch_size documents is embedded in one forward pass and
+        appended to the vector store in one write.
+        
         Args:
         - documents: list of document contents (List[string])
+        - batch_size: documents per embedding pass / store write (int)
+        - ids: optional stable id per document (List[string]); a document
+          whose id is already stored replaces the earlier version
+        
+        Returns:
+        - success status (bool), False if any batch failed
+        """
+        documents = list(documents)
+        ids = list(ids) if ids is not None else None
+        success = True
+        for start in tqdm(range(0, len(documents), batch_size), desc="Adding documents", unit="batch"):
+            batch_ids = ids[start:start + batch_size] if ids is not None else None
+            if not self.llm_rag.add_documents(documents[start:start + batch_size], ids=batch_ids):
+                success = False
+        return success
+    
+    def add_knowledge_from_notion(self, database_id: str, batch_size: int = 64) -> bool:
+        """
+        Import the pages of a Notion database into the knowledge base
+        
+        Only pages edited since the previous import are fetched (sync state is
+        kept in ./index/notion_sync.sqlite); page bodies are pulled
+        concurrently and added through add_knowledge_documents under their
+        Notion page id, so an edited page replaces its earlier version.
+        
+        Args:
+        - database_id: Notion database id (string)
+        - batch_size: documents per embedding pass / store write (int)
         
         Returns:
         - success status (bool)
         """
-        return self.llm_rag.add_documents(documents)
+        try:
+            imported = self._loop.run_until_complete(NotionImporter().sync(
+                database_id, lambda docs, ids: self.add_knowledge_documents(docs, batch_size=batch_size, ids=ids)
+            ))
+            logger.info("Imported %d Notion pages", imported)
+            return True
+        except Exception as e:
+            logger.error("Notion import error: %s", e)
+            return False
+
+
+# Process-local pipeline used by batch_process_audio_files(workers > 1)
+_worker_pipeline: Optional[VoicePipeline] = None
+
+
+def _worker_init(config: dict, log_level: int = logging.WARNING):
+    global _worker_pipeline
+    logger.setLevel(log_level)
+    _worker_pipeline = VoicePipeline(**config)
+
+
+def _worker_process(job: tuple) -> dict:
+    audio_file, output_audio = job
+    result = _worker_pipeline.process_audio_file(audio_file, output_audio)
+    result["input_file"] = audio_file
+    return result
 
 
 def demo():